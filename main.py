@@ -5,11 +5,19 @@ import os
 import io
 import re
 import json
+import gzip
+import zlib
 import time
+import calendar
 import random
-import string
 import asyncio
+import hashlib
+import heapq
+import sqlite3
+import traceback
+from collections import namedtuple, OrderedDict, deque
 from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
 
 # =========================
 # Third-Party Libraries
@@ -19,18 +27,26 @@ from discord import app_commands, Interaction, Embed, ui
 from discord.ext import tasks, commands
 import aiohttp
 import feedparser
-import requests
 from dotenv import load_dotenv
 
 # =========================
 # Local Modules
 # =========================
 try:
-    from ping_server import server_on
+    from ping_server import server_on, configure_websub, expect_websub_verification, websub_lease_expiry
 except ImportError:
     def server_on():
         pass
 
+    def configure_websub(handler, secret, topics):
+        pass
+
+    def expect_websub_verification(topic, lease_seconds):
+        pass
+
+    def websub_lease_expiry(topic):
+        return None
+
 # =========================
 # Environment Setup
 # =========================
@@ -43,11 +59,17 @@ event_entries = {}
 event_winners = {}
 event_configs = {}
 event_active = {}
+# Message and embed of each running event, so clicks never refetch them
+event_messages = {}
+event_embeds = {}
+
+# Entry-count edits are batched per message instead of sent per click
+event_edit_debounce_seconds = 1
+event_edit_min_interval_seconds = 5
 
 # =========================
 # HWID Reset System
 # =========================
-hwid_reset_timestamps = {}
 hwid_reset_cooldown = timedelta(days=1)
 
 # =========================
@@ -68,6 +90,35 @@ feed_url_youtube = {
 }
 youtube_xecret_hub_channel = "https://www.youtube.com/@XecretHub"
 
+# Each feed is polled on its own adaptive interval between these bounds
+feed_poll_min_seconds = 5 * 60
+feed_poll_max_seconds = 2 * 60 * 60
+feed_poll_gap_fraction = 0.02
+feed_poll_jitter = 0.1
+feed_poll_max_backoff_seconds = 6 * 60 * 60
+feed_poll_concurrency = 5
+
+# =========================
+# YouTube WebSub (push, optional)
+# =========================
+# Push needs both WEBSUB_CALLBACK_URL and WEBSUB_SECRET; otherwise only polling runs
+websub_hub_url = os.environ.get("WEBSUB_HUB_URL", "https://pubsubhubbub.appspot.com/subscribe")
+websub_callback_url = os.environ.get("WEBSUB_CALLBACK_URL")
+websub_secret = os.environ.get("WEBSUB_SECRET", "")
+websub_enabled = bool(websub_callback_url and websub_secret)
+if websub_callback_url and not websub_secret:
+    print("WEBSUB_CALLBACK_URL is set without WEBSUB_SECRET, push notifications stay disabled")
+# A push only triggers polls; the feed often lags, so retry with backoff until the video shows up
+websub_poll_delay_seconds = 15
+websub_poll_max_delay_seconds = 5 * 60
+websub_poll_max_retries = 12
+websub_lease_seconds = 5 * 24 * 60 * 60
+websub_renew_margin_seconds = 24 * 60 * 60
+websub_renew_check_minutes = 60
+# With push enabled, polling only catches missed notifications
+feed_fallback_min_seconds = 30 * 60
+feed_fallback_max_seconds = 6 * 60 * 60
+
 # =========================
 # Discord Channel / Roles
 # =========================
@@ -119,7 +170,51 @@ headers = {
     "Content-Type": "application/json"
 }
 
-response = requests.get(loader_json, headers=headers_master_key)
+# =========================
+# HTTP Client Settings
+# =========================
+luarmor_max_concurrency = 10
+luarmor_timeout_seconds = 10
+jsonbin_timeout_seconds = 15
+youtube_timeout_seconds = 15
+youtube_max_concurrency = 10
+http_keepalive_seconds = 30
+
+# =========================
+# Luarmor Rate Limit
+# =========================
+luarmor_requests_per_minute = 60
+luarmor_burst = 10
+luarmor_max_retries = 3
+luarmor_max_backoff_seconds = 30
+
+PRIORITY_STAFF = 0
+PRIORITY_BUYER = 1
+PRIORITY_BACKGROUND = 2
+
+# =========================
+# Local Storage
+# =========================
+data_dir = "data"
+database_path = os.path.join(data_dir, "xecret.db")
+user_mirror_sync_minutes = 10
+user_mirror_chunk_rows = 1000
+warmup_timeout_seconds = 15
+seen_videos_per_feed = 100
+jsonbin_sync_seconds = 60
+key_index_miss_refresh_seconds = 30
+
+# =========================
+# Circuit Breakers
+# =========================
+breaker_failure_threshold = 5
+breaker_reset_seconds = 30
+
+# =========================
+# User Record Cache
+# =========================
+user_cache_ttl_seconds = 60
+user_cache_max_size = 5000
 
 # =========================
 # Discord Bot Setup
@@ -128,13 +223,21 @@ intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-bot = commands.Bot(
+class XecretBot(commands.Bot):
+    async def close(self):
+        await luarmor_client.close()
+        await jsonbin_client.close()
+        await youtube_client.close()
+        await super().close()
+
+
+bot = XecretBot(
     command_prefix="$",
     intents=intents,
     help_command=None
 )
 
-sent_video_ids = set()
+startup_done = False
 
 # =========================
 # 1) Time Parsing / Format
@@ -209,83 +312,1053 @@ def is_support_or_admin():
 # =========================
 # 3) API Core Utils
 # =========================
-def fetch_scripts(response):
-    if response.status_code == 200:
-        return response.json().get("record", {})
-    return {}
+ApiResponse = namedtuple("ApiResponse", ["status", "data", "headers"])
 
-def load_key_database():
-    res = requests.get(keys_json, headers=headers_master_key)
-    if res.status_code != 200:
+
+class UpstreamUnavailable(Exception):
+    pass
+
+
+class UpstreamTimeout(UpstreamUnavailable):
+    """The request may have reached the upstream, so its outcome is unknown."""
+
+
+class StaleRecord(dict):
+    """Last known good data served while its upstream is degraded."""
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = None
+        self.trips = 0
+
+    @property
+    def message(self):
+        return f"{self.name} service is degraded right now, please try again in a few minutes."
+
+    def allow(self):
+        if self.state == "closed":
+            return True
+
+        now = time.monotonic()
+        if self.state == "open":
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+            self.probe_started = None
+
+        # Half-open: let a single probe through, and replace it if it never reported back
+        if self.probe_started is None or now - self.probe_started > self.reset_timeout:
+            self.probe_started = now
+            return True
+        return False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self.probe_started = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.probe_started = None
+
+
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
         return None
-    return res.json().get("record", {})
 
-def match_redeem_key(record, key):
-    for key_id, info in record.items():
-        if info.get("key") == key:
-            return info
-    return None
+
+class RequestScheduler:
+    def __init__(self, rate_per_minute, burst, max_retries=3, max_backoff=30):
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.paused_until = 0.0
+        self.lanes = {PRIORITY_STAFF: deque(), PRIORITY_BUYER: deque(), PRIORITY_BACKGROUND: deque()}
+        self.wait_stats = {p: [0, 0.0, 0.0] for p in self.lanes}
+        self.rate_limited = 0
+        self.wakeup = None
+        self.worker = None
+
+    def _ensure_worker(self):
+        if self.wakeup is None:
+            self.wakeup = asyncio.Event()
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self._run())
+
+    def _next_waiter(self):
+        for priority in sorted(self.lanes):
+            lane = self.lanes[priority]
+            while lane and lane[0][1].done():
+                lane.popleft()
+            if lane:
+                return priority, lane
+        return None, None
+
+    async def _run(self):
+        while True:
+            priority, lane = self._next_waiter()
+            if lane is None:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            if self.paused_until > now:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+
+            self.tokens -= 1
+            enqueued_at, future = lane.popleft()
+            waited = now - enqueued_at
+            stats = self.wait_stats[priority]
+            stats[0] += 1
+            stats[1] += waited
+            stats[2] = max(stats[2], waited)
+            future.set_result(None)
+
+    async def acquire(self, priority):
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        self.lanes[priority].append((time.monotonic(), future))
+        self.wakeup.set()
+        await future
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def submit(self, priority, send):
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(priority)
+            res = await send()
+            if res.status != 429:
+                return res
+
+            self.rate_limited += 1
+            delay = parse_retry_after(res.headers.get("Retry-After"))
+            if delay is None:
+                delay = min(self.max_backoff, 2 ** attempt) + random.random()
+            self.pause(min(delay, self.max_backoff))
+
+        raise UpstreamUnavailable("Luarmor is rate limiting us right now, please try again in a moment.")
+
+    def stats(self):
+        lanes = {}
+        for priority, lane in self.lanes.items():
+            served, total_wait, max_wait = self.wait_stats[priority]
+            lanes[priority] = {
+                "depth": sum(1 for _, future in lane if not future.done()),
+                "served": served,
+                "avg_wait": total_wait / served if served else 0.0,
+                "max_wait": max_wait,
+            }
+        return {
+            "lanes": lanes,
+            "tokens": self.tokens,
+            "rate_limited": self.rate_limited,
+            "paused_for": max(0.0, self.paused_until - time.monotonic()),
+        }
+
+
+class TTLCache:
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def get_stale(self, key, default=None):
+        # Expired entries stay until evicted so they can be served during outages
+        entry = self.entries.get(key)
+        return entry[1] if entry is not None else default
+
+    def set(self, key, value):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, key):
+        self.entries.pop(key, None)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class ApiClient:
+    def __init__(self, headers, max_concurrency=10, timeout=10, keepalive=30, scheduler=None):
+        self.headers = headers
+        self.scheduler = scheduler
+        self.max_concurrency = max_concurrency
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.keepalive = keepalive
+        self.session = None
+        self.semaphore = None
+
+    def _ensure_session(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                keepalive_timeout=self.keepalive,
+            )
+            self.session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=connector,
+                timeout=self.timeout,
+            )
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self.session
+
+    async def request(self, method, url, priority=PRIORITY_BUYER, breaker=None, raw=False, **kwargs):
+        if breaker is not None and not breaker.allow():
+            raise UpstreamUnavailable(breaker.message)
+        if self.scheduler is None:
+            return await self._send(method, url, breaker, raw, **kwargs)
+        return await self.scheduler.submit(priority, lambda: self._send(method, url, breaker, raw, **kwargs))
+
+    async def _send(self, method, url, breaker, raw, **kwargs):
+        session = self._ensure_session()
+        try:
+            async with self.semaphore:
+                async with session.request(method, url, **kwargs) as res:
+                    body = await res.read()
+                    if raw:
+                        data = body
+                    else:
+                        try:
+                            data = json.loads(body) if body else None
+                        except ValueError:
+                            data = None
+                    res = ApiResponse(res.status, data, res.headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if breaker is None:
+                raise
+            breaker.record_failure()
+            raise UpstreamTimeout(breaker.message) from e
+
+        if breaker is not None:
+            if res.status >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+        return res
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+
+class SingleFlight:
+    def __init__(self):
+        self.in_flight = {}
+        self.coalesced = 0
+
+    async def do(self, key, func):
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        self.in_flight.pop(key, None)
+        if not task.cancelled():
+            # Mark the error as retrieved even if every waiter was cancelled
+            task.exception()
+
+
+def open_database(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class StateStore:
+    schema = """
+        CREATE TABLE IF NOT EXISTS bot_state (
+            key   TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+
+    def _connect(self):
+        if self.conn is None:
+            self.conn = open_database(self.path)
+            self.conn.executescript(self.schema)
+        return self.conn
+
+    def get(self, key, default=None):
+        row = self._connect().execute("SELECT value FROM bot_state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key, value):
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO bot_state VALUES (?, ?)", (key, json.dumps(value)))
+
+
+Job = namedtuple("Job", ["kind", "key", "due", "payload", "persist"])
+
+
+class JobScheduler:
+    schema = """
+        CREATE TABLE IF NOT EXISTS scheduled_jobs (
+            kind    TEXT NOT NULL,
+            key     TEXT NOT NULL,
+            due     REAL NOT NULL,
+            payload TEXT,
+            PRIMARY KEY (kind, key)
+        );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+        self.handlers = {}
+        self.jobs = {}
+        self.heap = []
+        self.seq = 0
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.completed = 0
+        self.failed = 0
+
+    def _connect(self):
+        if self.conn is None:
+            self.conn = open_database(self.path)
+            self.conn.executescript(self.schema)
+            for kind, key, due, payload in self.conn.execute("SELECT * FROM scheduled_jobs"):
+                self._push(Job(kind, key, due, json.loads(payload), True))
+        return self.conn
+
+    def register(self, kind, handler=None):
+        # handler(key, payload) runs when a job is due; None means the job only expires
+        self.handlers[kind] = handler
+
+    def _push(self, job):
+        self.seq += 1
+        self.jobs[(job.kind, job.key)] = (job, self.seq)
+        heapq.heappush(self.heap, (job.due, self.seq, job.kind, job.key))
+        self.wakeup.set()
+
+    def schedule(self, kind, key, due, payload=None, persist=True):
+        conn = self._connect()
+        job = Job(kind, str(key), due, payload, persist)
+        # Rescheduling replaces the job; its old heap entry is skipped when popped
+        self._push(job)
+        if persist:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO scheduled_jobs VALUES (?, ?, ?, ?)",
+                    (kind, job.key, due, json.dumps(payload)),
+                )
+        return job
+
+    def get(self, kind, key):
+        self._connect()
+        entry = self.jobs.get((kind, str(key)))
+        return entry[0] if entry else None
+
+    def cancel(self, kind, key):
+        self._connect()
+        entry = self.jobs.pop((kind, str(key)), None)
+        if entry and entry[0].persist:
+            self._delete(entry[0])
+        return entry is not None
+
+    def _delete(self, job):
+        with self.conn:
+            self.conn.execute("DELETE FROM scheduled_jobs WHERE kind = ? AND key = ?", (job.kind, job.key))
+
+    def pending(self, kind=None):
+        self._connect()
+        jobs = (job for job, _ in self.jobs.values() if kind is None or job.kind == kind)
+        return sorted(jobs, key=lambda job: job.due)
+
+    def start(self):
+        # Jobs that came due while the bot was offline run on the first pass
+        self._connect()
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            self.wakeup.clear()
+            now = time.time()
+            while self.heap and self.heap[0][0] <= now:
+                due, seq, kind, key = heapq.heappop(self.heap)
+                entry = self.jobs.get((kind, key))
+                if entry is None or entry[1] != seq:
+                    continue
+                job = entry[0]
+                del self.jobs[(kind, key)]
+                if job.persist:
+                    self._delete(job)
+
+                if kind not in self.handlers:
+                    print(f"Dropping job {kind}:{key}, no handler registered")
+                elif self.handlers[kind] is not None:
+                    asyncio.create_task(self._execute(job, self.handlers[kind]))
+
+            timeout = self.heap[0][0] - now if self.heap else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _execute(self, job, handler):
+        try:
+            await handler(job.key, job.payload)
+            self.completed += 1
+        except Exception as e:
+            self.failed += 1
+            print(f"Job {job.kind}:{job.key} failed: {e!r}")
+
+    def stats(self):
+        kinds = {}
+        for job in self.pending():
+            count, next_due = kinds.get(job.kind, (0, job.due))
+            kinds[job.kind] = (count + 1, next_due)
+        return {"kinds": kinds, "completed": self.completed, "failed": self.failed}
+
+
+class UserMirror:
+    table = """
+        CREATE TABLE IF NOT EXISTS {name} (
+            user_key    TEXT PRIMARY KEY,
+            discord_id  TEXT,
+            status      TEXT,
+            auth_expire INTEGER,
+            data        TEXT NOT NULL,
+            synced_at   REAL NOT NULL
+        )
+    """
+    indexes = [
+        "CREATE INDEX IF NOT EXISTS idx_luarmor_users_discord_id ON luarmor_users(discord_id)",
+        "CREATE INDEX IF NOT EXISTS idx_luarmor_users_status ON luarmor_users(status)",
+        "CREATE INDEX IF NOT EXISTS idx_luarmor_users_auth_expire ON luarmor_users(auth_expire)",
+    ]
+    schema = table.format(name="luarmor_users") + ";\n" + ";\n".join(indexes) + ";"
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+        self.ready = False
+        self.last_synced = None
+
+    def _connect(self):
+        if self.conn is None:
+            self.conn = open_database(self.path)
+            self.conn.executescript(self.schema)
+        return self.conn
+
+    @staticmethod
+    def _row(user, now):
+        return (
+            user.get("user_key"),
+            str(user.get("discord_id") or "") or None,
+            user.get("status"),
+            int(user["auth_expire"]) if user.get("auth_expire") is not None else -1,
+            json.dumps(user),
+            now,
+        )
+
+    def get(self, discord_id, stale_ok=False):
+        if not self.ready and not stale_ok:
+            return None
+        row = self._connect().execute(
+            "SELECT data FROM luarmor_users WHERE discord_id = ? LIMIT 1",
+            (str(discord_id),),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def upsert(self, user):
+        if not user.get("user_key"):
+            return
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "DELETE FROM luarmor_users WHERE discord_id = ? AND user_key != ?",
+                (str(user.get("discord_id") or ""), user["user_key"]),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO luarmor_users VALUES (?, ?, ?, ?, ?, ?)",
+                self._row(user, time.time()),
+            )
+
+    def remove(self, discord_id):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM luarmor_users WHERE discord_id = ?", (str(discord_id),))
+
+    def replace_all(self, users):
+        self._connect()
+        now = time.time()
+        rows = [self._row(user, now) for user in users if user.get("user_key")]
+
+        # Build the snapshot in a staging table in small transactions, then swap it in.
+        # Other writers to this database (cooldowns, event entries) only ever wait for one
+        # chunk or the swap, never for the whole rewrite.
+        conn = open_database(self.path)
+        try:
+            conn.execute("DROP TABLE IF EXISTS luarmor_users_staging")
+            conn.execute(self.table.format(name="luarmor_users_staging"))
+            for i in range(0, len(rows), user_mirror_chunk_rows):
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO luarmor_users_staging VALUES (?, ?, ?, ?, ?, ?)",
+                        rows[i:i + user_mirror_chunk_rows],
+                    )
+
+            # sqlite3 doesn't open a transaction for DDL on its own; readers must never see the table missing
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DROP TABLE luarmor_users")
+                conn.execute("ALTER TABLE luarmor_users_staging RENAME TO luarmor_users")
+                for statement in self.indexes:
+                    conn.execute(statement)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+        self.last_synced = now
+        self.ready = True
+        return len(rows)
+
+    def stats(self):
+        if self.conn is None:
+            return {"ready": self.ready, "total": 0, "by_status": {}, "expiring": 0}
+        by_status = dict(self.conn.execute(
+            "SELECT status, COUNT(*) FROM luarmor_users GROUP BY status"
+        ).fetchall())
+        now = int(time.time())
+        expiring = self.conn.execute(
+            "SELECT COUNT(*) FROM luarmor_users WHERE auth_expire BETWEEN ? AND ?",
+            (now, now + 86400),
+        ).fetchone()[0]
+        return {
+            "ready": self.ready,
+            "total": sum(by_status.values()),
+            "by_status": by_status,
+            "expiring": expiring,
+        }
+
+
+luarmor_users_breaker = CircuitBreaker("Luarmor", breaker_failure_threshold, breaker_reset_seconds)
+luarmor_actions_breaker = CircuitBreaker("Luarmor HWID/Blacklist", breaker_failure_threshold, breaker_reset_seconds)
+jsonbin_keys_breaker = CircuitBreaker("Key database", breaker_failure_threshold, breaker_reset_seconds)
+jsonbin_loader_breaker = CircuitBreaker("Script loader", breaker_failure_threshold, breaker_reset_seconds)
+circuit_breakers = [
+    luarmor_users_breaker,
+    luarmor_actions_breaker,
+    jsonbin_keys_breaker,
+    jsonbin_loader_breaker,
+]
+
+luarmor_scheduler = RequestScheduler(
+    luarmor_requests_per_minute,
+    luarmor_burst,
+    max_retries=luarmor_max_retries,
+    max_backoff=luarmor_max_backoff_seconds,
+)
+
+luarmor_client = ApiClient(
+    headers,
+    max_concurrency=luarmor_max_concurrency,
+    timeout=luarmor_timeout_seconds,
+    keepalive=http_keepalive_seconds,
+    scheduler=luarmor_scheduler,
+)
+
+jsonbin_client = ApiClient(
+    headers_master_key,
+    timeout=jsonbin_timeout_seconds,
+    keepalive=http_keepalive_seconds,
+)
+
+youtube_client = ApiClient(
+    {},
+    max_concurrency=youtube_max_concurrency,
+    timeout=youtube_timeout_seconds,
+    keepalive=http_keepalive_seconds,
+)
+
+user_cache = TTLCache(user_cache_ttl_seconds, user_cache_max_size)
+user_mirror = UserMirror(database_path)
+bot_state = StateStore(database_path)
+job_scheduler = JobScheduler(database_path)
+single_flight = SingleFlight()
+
+class RecordSync:
+    def __init__(self, name, url, breaker):
+        self.name = name
+        self.url = url
+        self.breaker = breaker
+        self.record = {}
+        self.version = None
+        self.etag = None
+        self.last_modified = None
+        self.loaded = False
+        self.failing = False
+        self.last_synced = None
+        self.last_changed = None
+        self.listeners = []
+        self.applying = asyncio.Lock()
+
+    def on_change(self, callback):
+        self.listeners.append(callback)
+
+    def snapshot(self):
+        return StaleRecord(self.record) if self.failing else self.record
+
+    def conditional_headers(self):
+        conditional = {}
+        if self.etag:
+            conditional["If-None-Match"] = self.etag
+        if self.last_modified:
+            conditional["If-Modified-Since"] = self.last_modified
+        return conditional
+
+    async def refresh(self):
+        return await single_flight.do(f"jsonbin:{self.name}", self._refresh)
+
+    async def _refresh(self):
+        try:
+            res = await jsonbin_client.request(
+                "GET", self.url, raw=True,
+                breaker=self.breaker, headers=self.conditional_headers(),
+            )
+        except UpstreamUnavailable:
+            self.failing = True
+            return False
+
+        if res.status == 304 and self.loaded:
+            self.failing = False
+            self.last_synced = time.time()
+            return False
+        if res.status != 200 or not res.data:
+            self.failing = True
+            return False
+
+        # Hash the body as received so an unchanged record is never parsed at all
+        version = hashlib.sha256(res.data).hexdigest()
+        if version != self.version:
+            try:
+                payload = await asyncio.to_thread(json.loads, res.data)
+            except ValueError:
+                self.failing = True
+                return False
+            if not isinstance(payload, dict):
+                self.failing = True
+                return False
+
+        self.failing = False
+        self.last_synced = time.time()
+        self.etag = res.headers.get("ETag")
+        self.last_modified = res.headers.get("Last-Modified")
+        if version == self.version:
+            return False
+        await self.apply(payload.get("record", {}), version)
+        return True
+
+    async def apply(self, record, version=None):
+        async with self.applying:
+            # Index rebuilds are CPU-bound on a large record, so keep them off the event loop
+            for callback in self.listeners:
+                await asyncio.to_thread(callback, record)
+
+            # Swap the whole reference so readers never see a half-updated snapshot
+            self.record, self.version = record, version
+            self.loaded = True
+            self.last_changed = time.time()
+
+    async def write(self, record):
+        url = self.url[:-len("/latest")] if self.url.endswith("/latest") else self.url
+        res = await jsonbin_client.request("PUT", url, raw=True, breaker=self.breaker, json=record)
+        if res.status != 200:
+            try:
+                message = json.loads(res.data).get("message", f"HTTP {res.status}")
+            except (ValueError, AttributeError):
+                message = f"HTTP {res.status}"
+            raise UpstreamUnavailable(f"Failed to update the {self.name} record: {message}")
+        self.etag = None
+        self.last_modified = None
+        # No version: the next refresh hashes the stored body afresh
+        await self.apply(record)
+
+
+class KeyIndex:
+    def __init__(self):
+        self.by_key = {}
+        self.loaded = False
+
+    def rebuild(self, record):
+        by_key = {}
+        for key_id, info in record.items():
+            if isinstance(info, dict) and info.get("key"):
+                by_key[info["key"]] = (key_id, info)
+        self.by_key = by_key
+        self.loaded = True
+
+    def lookup(self, key):
+        return self.by_key.get(key)
+
+
+class RedemptionLedger:
+    schema = """
+        CREATE TABLE IF NOT EXISTS redemption_claims (
+            redeem_key TEXT PRIMARY KEY,
+            discord_id TEXT NOT NULL,
+            status     TEXT NOT NULL,
+            claimed_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS redemption_log (
+            id         INTEGER PRIMARY KEY AUTOINCREMENT,
+            redeem_key TEXT NOT NULL,
+            discord_id TEXT NOT NULL,
+            action     TEXT NOT NULL,
+            detail     TEXT,
+            at         REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+        self.used_keys = set()
+
+    def _connect(self):
+        if self.conn is None:
+            self.conn = open_database(self.path)
+            self.conn.executescript(self.schema)
+            self.used_keys = {row[0] for row in self.conn.execute("SELECT redeem_key FROM redemption_claims")}
+        return self.conn
+
+    def _log(self, key, discord_id, action, detail=None):
+        self.conn.execute(
+            "INSERT INTO redemption_log (redeem_key, discord_id, action, detail, at) VALUES (?, ?, ?, ?, ?)",
+            (key, str(discord_id), action, detail, time.time()),
+        )
+
+    def is_used(self, key):
+        self._connect()
+        return key in self.used_keys
+
+    def claim(self, key, discord_id):
+        conn = self._connect()
+        if key in self.used_keys:
+            return False
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO redemption_claims VALUES (?, ?, 'pending', ?)",
+                    (key, str(discord_id), time.time()),
+                )
+                self._log(key, discord_id, "claimed")
+        except sqlite3.IntegrityError:
+            return False
+        self.used_keys.add(key)
+        return True
+
+    def confirm(self, key, discord_id):
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE redemption_claims SET status = 'redeemed' WHERE redeem_key = ?", (key,))
+            self._log(key, discord_id, "redeemed")
+
+    def mark_unknown(self, key, discord_id, detail):
+        # Luarmor may have applied the redeem, so the key stays claimed until staff check it
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE redemption_claims SET status = 'unknown' WHERE redeem_key = ?", (key,))
+            self._log(key, discord_id, "unknown", detail)
+
+    def release(self, key, discord_id, reason):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM redemption_claims WHERE redeem_key = ?", (key,))
+            self._log(key, discord_id, "released", reason)
+        self.used_keys.discard(key)
+
+    def stats(self):
+        conn = self._connect()
+        return dict(conn.execute("SELECT status, COUNT(*) FROM redemption_claims GROUP BY status").fetchall())
+
+
+keys_sync = RecordSync("keys", keys_json, jsonbin_keys_breaker)
+loader_sync = RecordSync("loader", loader_json, jsonbin_loader_breaker)
+jsonbin_records = [keys_sync, loader_sync]
+
+key_index = KeyIndex()
+keys_sync.on_change(key_index.rebuild)
+
+redemption_ledger = RedemptionLedger(database_path)
+
+
+def next_key_number(record):
+    numbers = [int(m.group(1)) for m in map(re.compile(r"Key(\d+)$").match, record) if m]
+    return max(numbers, default=0) + 1
+
+
+async def publish_keys(batch, max_attempts=3):
+    for _ in range(max_attempts):
+        # A failed refresh keeps the old snapshot loaded; writing from it would drop other writers' keys
+        await keys_sync.refresh()
+        if keys_sync.failing or not keys_sync.loaded:
+            raise UpstreamUnavailable(jsonbin_keys_breaker.message)
+        base_version = keys_sync.version
+
+        merged = dict(keys_sync.record)
+        existing = {info.get("key") for info in merged.values() if isinstance(info, dict)}
+        # Renumber the whole batch if the record grew past the ids it was generated with
+        number = next_key_number(merged)
+        renumber = any(key_id in merged for key_id, _, _ in batch)
+        written = []
+        for key_id, key, d in batch:
+            if key in existing:
+                continue
+            if renumber:
+                key_id = f"Key{number + len(written)}"
+            merged[key_id] = {"key": key, "day": [d]}
+            written.append((key_id, key, d))
+
+        # JSONBin has no conditional write, so re-read right before writing and retry on conflict
+        await keys_sync.refresh()
+        if keys_sync.failing:
+            raise UpstreamUnavailable(jsonbin_keys_breaker.message)
+        if keys_sync.version != base_version:
+            continue
+
+        await keys_sync.write(merged)
+        # The ids actually stored, which differ from the batch when it was renumbered
+        return written
+
+    raise UpstreamUnavailable("The key database kept changing while publishing, please try again.")
+
+
+async def match_redeem_key(key):
+    if not key_index.loaded:
+        await keys_sync.refresh()
+
+    entry = key_index.lookup(key)
+    last_synced = keys_sync.last_synced or 0
+    if entry is None and time.time() - last_synced > key_index_miss_refresh_seconds:
+        # The key may have been added since the last sync; a conditional GET is cheap
+        await keys_sync.refresh()
+        entry = key_index.lookup(key)
+
+    return entry[1] if entry else None
 
 # =========================
 # 4) Whitelist / Key Functions
 # =========================
-def fetch_user_key(interaction):
-    params = {"discord_id": interaction.user.id}
-    res = requests.get(url_project_users, headers=headers, params=params)
-    if res.status_code == 200:
-        return res.json()["users"][0]["user_key"]
-    return None
+_NOT_WHITELISTED = object()
+# Bumped by invalidate_user; fetches started under an older generation are discarded
+user_generations = {}
 
 
-def fetch_user_data(interaction):
-    params = {"discord_id": str(interaction.user.id)}
-    res = requests.get(url_project_users, headers=headers, params=params)
-    if res.status_code != 200:
-        return None
-    data = res.json()
-    users = data.get("users", [])
-    return users[0] if users else None
+async def fetch_user_data_from_id(discord_id: int, priority=PRIORITY_BUYER):
+    mirrored = user_mirror.get(discord_id)
+    if mirrored:
+        return mirrored
 
+    cached = user_cache.get(discord_id)
+    if cached is not None:
+        return None if cached is _NOT_WHITELISTED else cached
 
-def fetch_user_data_from_id(discord_id: int):
+    try:
+        return await _fetch_user_current(discord_id, priority)
+    except UpstreamUnavailable:
+        stale = user_mirror.get(discord_id, stale_ok=True) or user_cache.get_stale(discord_id)
+        if stale is None or stale is _NOT_WHITELISTED:
+            raise
+        return StaleRecord(stale)
+
+
+def _fetch_user_current(discord_id: int, priority):
+    # Keyed by generation so a lookup after a mutation never joins a request sent before it
+    generation = user_generations.get(discord_id, 0)
+    return single_flight.do(
+        f"luarmor:user:{discord_id}:{generation}",
+        lambda: _fetch_user_record(discord_id, priority, generation),
+    )
+
+
+async def _fetch_user_record(discord_id: int, priority, generation):
     params = {"discord_id": str(discord_id)}
-    res = requests.get(url_project_users, headers=headers, params=params)
-    if res.status_code != 200:
+    res = await luarmor_client.request(
+        "GET", url_project_users,
+        priority=priority, breaker=luarmor_users_breaker, params=params,
+    )
+    if res.status != 200 or not isinstance(res.data, dict) or "users" not in res.data:
+        # Only a successful, empty lookup means "not whitelisted"; anything else is an outage
+        raise UpstreamUnavailable(luarmor_users_breaker.message)
+    users = res.data["users"]
+    user = users[0] if users else None
+    if user_generations.get(discord_id, 0) != generation:
+        # Invalidated while in flight; the answer may predate the mutation
+        return user
+    user_cache.set(discord_id, user if user else _NOT_WHITELISTED)
+    if user:
+        user_mirror.upsert(user)
+    else:
+        user_mirror.remove(discord_id)
+    return user
+
+
+def invalidate_user(discord_id: int, reconcile=True):
+    user_generations[discord_id] = user_generations.get(discord_id, 0) + 1
+    user_cache.invalidate(discord_id)
+    user_mirror.remove(discord_id)
+    if reconcile:
+        asyncio.create_task(reconcile_user(discord_id))
+
+
+async def reconcile_user(discord_id: int):
+    try:
+        await _fetch_user_current(discord_id, PRIORITY_STAFF)
+    except Exception as e:
+        print(f"Failed to refresh user {discord_id}: {e}")
+
+
+async def sync_all_users():
+    generations = dict(user_generations)
+    res = await luarmor_client.request(
+        "GET", url_project_users,
+        priority=PRIORITY_BACKGROUND, breaker=luarmor_users_breaker,
+    )
+    if res.status != 200 or not res.data:
         return None
-    users = res.json().get("users", [])
-    return users[0] if users else None
+    users = res.data.get("users", [])
+    count = await asyncio.to_thread(user_mirror.replace_all, users)
+    # Users mutated while the snapshot was fetched or written are left to their own reconcile
+    for discord_id, generation in list(user_generations.items()):
+        if generations.get(discord_id, 0) != generation:
+            user_mirror.remove(discord_id)
+    return count
 
-def redeem_key_api(interaction, matched_key):
+
+async def fetch_user_data(interaction):
+    return await fetch_user_data_from_id(interaction.user.id)
+
+
+async def fetch_user_key(interaction):
+    user = await fetch_user_data(interaction)
+    return user.get("user_key") if user else None
+
+async def redeem_key_api(interaction, matched_key):
     body = {
         "discord_id": str(interaction.user.id),
         "note": "Redeem Key Via Xecret Hub",
         "key_days": matched_key.get("day", [0])[0],
     }
-    return requests.post(url_project_users, headers=headers, json=body).json()
+    return await luarmor_client.request("POST", url_project_users, breaker=luarmor_users_breaker, json=body)
 
-def create_user_key(discord_id: int, days: int, note: str):
+async def create_user_key(discord_id: int, days: int, note: str):
     body = {"discord_id": str(discord_id), "key_days": days, "note": note or "None"}
-    return requests.post(url_project_users, headers=headers, json=body).json()
+    res = await luarmor_client.request(
+        "POST", url_project_users,
+        priority=PRIORITY_STAFF, breaker=luarmor_users_breaker, json=body,
+    )
+    return res.data or {}
 
 
-def delete_user_key(user_key: str):
-    delete_url = f"{url_project_users}?user_key={user_key}"
-    return requests.delete(delete_url, headers=headers).json()
+async def delete_user_key(user_key: str):
+    params = {"user_key": user_key}
+    res = await luarmor_client.request(
+        "DELETE", url_project_users,
+        priority=PRIORITY_STAFF, breaker=luarmor_users_breaker, params=params,
+    )
+    return res.data or {}
 
 # =========================
 # 5) HWID Functions
 # =========================
+job_scheduler.register("hwid_cooldown")
+
+
 def check_hwid_cooldown(user_id, now):
-    last_reset = hwid_reset_timestamps.get(user_id)
-    if last_reset and now - last_reset < hwid_reset_cooldown:
-        return hwid_reset_cooldown - (now - last_reset)
-    hwid_reset_timestamps[user_id] = now
+    job = job_scheduler.get("hwid_cooldown", user_id)
+    if job:
+        last_reset = datetime.fromtimestamp(job.payload["reset_at"])
+        if now - last_reset < hwid_reset_cooldown:
+            return hwid_reset_cooldown - (now - last_reset)
+    job_scheduler.schedule(
+        "hwid_cooldown", user_id, (now + hwid_reset_cooldown).timestamp(), {"reset_at": now.timestamp()}
+    )
     return None
 
 
-def reset_hwid_api(user_key: str):
+def reschedule_hwid_cooldowns():
+    # Pending cooldowns follow the new length, as if measured from their last reset
+    for job in job_scheduler.pending("hwid_cooldown"):
+        job_scheduler.schedule(
+            "hwid_cooldown", job.key, job.payload["reset_at"] + hwid_reset_cooldown.total_seconds(), job.payload
+        )
+
+
+async def reset_hwid_api(user_key: str, priority=PRIORITY_BUYER):
     body = {"user_key": user_key, "force": True}
-    return requests.post(url_resethwid_users, headers=headers, json=body).json()
+    res = await luarmor_client.request(
+        "POST", url_resethwid_users,
+        priority=priority, breaker=luarmor_actions_breaker, json=body,
+    )
+    return res.data or {}
 
 # =========================
 # 6) Blacklist / Unblacklist Functions
@@ -310,35 +1383,124 @@ def parse_duration(duration: str):
     raise ValueError("Invalid duration format")
 
 
-def blacklist_user(user_key: str, reason: str, ban_expire: int):
+async def blacklist_user(user_key: str, reason: str, ban_expire: int):
     url = f"https://api.luarmor.net/v3/projects/{project_id}/users/blacklist"
     body = {"user_key": user_key, "ban_reason": reason, "ban_expire": ban_expire}
-    return requests.post(url, headers=headers, json=body).json()
+    res = await luarmor_client.request(
+        "POST", url,
+        priority=PRIORITY_STAFF, breaker=luarmor_actions_breaker, json=body,
+    )
+    return res.data or {}
+
+
+async def unblacklist_user(unban_token: str):
+    url = f"https://api.luarmor.net/v3/projects/{project_id}/users/unban"
+    params = {"unban_token": unban_token}
+    return await luarmor_client.request(
+        "GET", url,
+        priority=PRIORITY_STAFF, breaker=luarmor_actions_breaker, params=params,
+    )
+
+def track_blacklist_expiry(guild, member, user_key, ban_expire):
+    # Luarmor lifts the ban itself; we only refresh our copy and log it when it does
+    if ban_expire == -1:
+        job_scheduler.cancel("blacklist_expiry", member.id)
+        return
+    job_scheduler.schedule(
+        "blacklist_expiry", member.id, ban_expire, {"guild_id": guild.id, "user_key": user_key}
+    )
 
 
-def unblacklist_user(unban_token: str):
-    url = f"https://api.luarmor.net/v3/projects/{project_id}/users/unban?unban_token={unban_token}"
-    return requests.get(url)
+async def on_blacklist_expired(discord_id, payload):
+    invalidate_user(int(discord_id))
+    guild = bot.get_guild(payload["guild_id"])
+    member = guild.get_member(int(discord_id)) if guild else None
+    if not member:
+        return
+    log = send_action_log(
+        guild,
+        member,
+        "Blacklist Expired",
+        f"User: {member.mention}\nKey: ||{payload['user_key']}||\nStatus: Temporary blacklist expired.",
+        discord.Color.green(),
+    )
+    if log:
+        await log
+
+
+job_scheduler.register("blacklist_expiry", on_blacklist_expired)
 
 # =========================
 # 7) Script / Loader Functions
 # =========================
-def fetch_scripts_data():
-    res = requests.get(loader_json, headers=headers_master_key)
-    if res.status_code != 200:
-        return {}
-    return res.json().get("record", {})
+async def fetch_scripts_data():
+    if not loader_sync.loaded:
+        await loader_sync.refresh()
+    return loader_sync.snapshot()
+
+
+class CatalogIndex:
+    ngram_size = 3
+
+    def __init__(self):
+        self.entries = []
+        self.ngrams = {}
+
+    def rebuild(self, scripts_data):
+        entries = []
+        for key, script in scripts_data.items():
+            label = script.get("name", key) if isinstance(script, dict) else key
+            label = str(label)[:100]
+            lower = label.lower()
+            words = tuple(lower.split())
+            entries.append((lower, words, app_commands.Choice(name=label, value=key)))
+        entries.sort(key=lambda entry: entry[0])
+
+        # Every substring up to ngram_size chars maps to the entries containing it
+        ngrams = {}
+        for i, (lower, _, _) in enumerate(entries):
+            for n in range(1, self.ngram_size + 1):
+                for start in range(len(lower) - n + 1):
+                    ngrams.setdefault(lower[start:start + n], set()).add(i)
+
+        self.entries, self.ngrams = entries, ngrams
+
+    def search(self, query, limit=25):
+        query = query.lower().strip()
+        entries = self.entries
+        if not query:
+            return [choice for _, _, choice in entries[:limit]]
+
+        if len(query) <= self.ngram_size:
+            candidates = self.ngrams.get(query, ())
+        else:
+            grams = [query[i:i + self.ngram_size] for i in range(len(query) - self.ngram_size + 1)]
+            candidates = set.intersection(*(self.ngrams.get(g, set()) for g in grams))
+
+        ranked = []
+        for i in candidates:
+            lower, words, choice = entries[i]
+            if lower.startswith(query):
+                rank = 0
+            elif any(word.startswith(query) for word in words):
+                rank = 1
+            elif query in lower:
+                rank = 2
+            else:
+                continue
+            ranked.append((rank, i, choice))
+
+        ranked.sort(key=lambda item: (item[0], item[1]))
+        return [choice for _, _, choice in ranked[:limit]]
+
+
+catalog_index = CatalogIndex()
+loader_sync.on_change(catalog_index.rebuild)
 
 
 async def script_autocomplete(interaction, current):
     try:
-        scripts_data = fetch_scripts_data()
-        choices = []
-        for key, script in scripts_data.items():
-            label = script.get("name", key)
-            if current.lower() in label.lower():
-                choices.append(app_commands.Choice(name=label, value=key))
-        return choices[:25]
+        return catalog_index.search(current)
     except:
         return []
 
@@ -353,16 +1515,40 @@ def build_select_options(scripts_data):
         for key, script in scripts_data.items()
     ]
 
+
+SELECT_OPTION_LIMIT = 25
+
+
+class ScriptPages:
+    def __init__(self):
+        self.scripts_data = {}
+        self.pages = []
+
+    def rebuild(self, scripts_data):
+        options = build_select_options(scripts_data)
+        pages = [options[i:i + SELECT_OPTION_LIMIT] for i in range(0, len(options), SELECT_OPTION_LIMIT)]
+        self.scripts_data, self.pages = scripts_data, pages
+
+    def snapshot(self):
+        return self.scripts_data, self.pages
+
+
+script_pages = ScriptPages()
+loader_sync.on_change(script_pages.rebuild)
+
 # =========================
 # 8) Ticket System Functions
 # =========================
-def check_ticket_cooldown(user_id: int, cooldowns: dict, cooldown_seconds: int = 3600):
+job_scheduler.register("ticket_cooldown")
+
+
+def check_ticket_cooldown(user_id: int, cooldown_seconds: int = 3600):
     now = time.time()
-    last_used = cooldowns.get(user_id)
-    if last_used and now - last_used < cooldown_seconds:
-        remaining = int((cooldown_seconds - (now - last_used)) // 60)
+    job = job_scheduler.get("ticket_cooldown", user_id)
+    if job and job.due > now:
+        remaining = int((job.due - now) // 60)
         return False, remaining
-    cooldowns[user_id] = now
+    job_scheduler.schedule("ticket_cooldown", user_id, now + cooldown_seconds)
     return True, 0
 
 
@@ -403,37 +1589,379 @@ async def send_ticket_message(channel, user, ticket_type):
 # =========================
 # 9) Showcase (YouTube)
 # =========================
-def preload_latest_video_ids():
-    """โหลด video id ล่าสุดเข้าชุดกันซ้ำ"""
-    for url in feed_url_youtube.values():
-        feed = feedparser.parse(url)
-        if feed.entries:
-            latest = feed.entries[0]
-            video_id = latest.yt_videoid
-            sent_video_ids.add(video_id)
+class FeedPoller:
+    def __init__(self, client):
+        self.client = client
+        self.validators = {}
 
+    async def fetch(self, feed_url: str):
+        """โหลด feed แบบ conditional GET คืน None ถ้า feed ไม่เปลี่ยน (304)"""
+        etag, modified = self.validators.get(feed_url, (None, None))
+        conditional = {}
+        if etag:
+            conditional["If-None-Match"] = etag
+        if modified:
+            conditional["If-Modified-Since"] = modified
+
+        res = await self.client.request("GET", feed_url, raw=True, headers=conditional)
+        if res.status == 304:
+            return None
+        if res.status != 200:
+            raise RuntimeError(f"YouTube feed returned HTTP {res.status}")
+
+        self.validators[feed_url] = (res.headers.get("ETag"), res.headers.get("Last-Modified"))
+        return await asyncio.to_thread(feedparser.parse, res.data)
+
+    def forget(self, feed_url: str):
+        """ลืม ETag ของ feed เพื่อให้รอบถัดไปโหลด feed เต็มอีกครั้ง"""
+        self.validators.pop(feed_url, None)
 
-async def fetch_latest_video(feed_url: str):
-    """โหลดข้อมูลวิดีโอล่าสุดจาก YouTube Feed"""
-    feed = feedparser.parse(feed_url)
-    
-    if not feed.entries:
-        return None
 
-    latest = feed.entries[0]
-    video_id = latest.yt_videoid
+feed_poller = FeedPoller(youtube_client)
+
+
+def build_video_data(entry):
+    """แปลง entry จาก feed เป็นข้อมูลวิดีโอ"""
+    video_id = entry.yt_videoid
+    published_parsed = getattr(entry, "published_parsed", None)
 
     return {
         "id": video_id,
-        "title": latest.title,
-        "link": latest.link,
-        "published": latest.published,
-        "author": getattr(latest, "author", None),
+        "title": entry.title,
+        "link": entry.link,
+        "published": entry.published,
+        "author": getattr(entry, "author", None),
         "thumbnail": f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg",
-        "updated": getattr(latest, "updated", latest.published),
-        "description": getattr(latest, "summary", "")
+        "updated": getattr(entry, "updated", entry.published),
+        "description": getattr(entry, "summary", ""),
+        "published_ts": calendar.timegm(published_parsed) if published_parsed else 0,
+    }
+
+
+class SeenVideoStore:
+    schema = """
+        CREATE TABLE IF NOT EXISTS seen_videos (
+            video_id  TEXT PRIMARY KEY,
+            feed_url  TEXT NOT NULL,
+            published TEXT,
+            seen_at   REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_seen_videos_feed ON seen_videos(feed_url, seen_at);
+    """
+
+    def __init__(self, path, per_feed):
+        self.path = path
+        self.per_feed = per_feed
+        self.conn = None
+
+    def _connect(self):
+        if self.conn is None:
+            self.conn = open_database(self.path)
+            self.conn.executescript(self.schema)
+        return self.conn
+
+    def has_feed(self, feed_url):
+        """เช็คว่าเคยเห็น feed นี้แล้วหรือยัง"""
+        row = self._connect().execute(
+            "SELECT 1 FROM seen_videos WHERE feed_url = ? LIMIT 1", (feed_url,)
+        ).fetchone()
+        return row is not None
+
+    def seen_ids(self, video_ids):
+        """คืน id ของวิดีโอที่เคยประกาศแล้ว"""
+        ids = list(video_ids)
+        if not ids:
+            return set()
+        placeholders = ",".join("?" * len(ids))
+        return {row[0] for row in self._connect().execute(
+            f"SELECT video_id FROM seen_videos WHERE video_id IN ({placeholders})", ids
+        )}
+
+    def unseen(self, videos):
+        """คืนเฉพาะวิดีโอที่ยังไม่เคยประกาศ"""
+        seen = self.seen_ids(video["id"] for video in videos)
+        return [video for video in videos if video["id"] not in seen]
+
+    def mark(self, feed_url, videos):
+        """บันทึกวิดีโอที่ประกาศแล้ว และลบของเก่าเกินจำนวนที่เก็บต่อ feed"""
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO seen_videos VALUES (?, ?, ?, ?)",
+                [(video["id"], feed_url, video["published"], now) for video in videos],
+            )
+            conn.execute(
+                """
+                DELETE FROM seen_videos WHERE feed_url = ? AND video_id NOT IN (
+                    SELECT video_id FROM seen_videos WHERE feed_url = ?
+                    ORDER BY seen_at DESC LIMIT ?
+                )
+                """,
+                (feed_url, feed_url, self.per_feed),
+            )
+
+
+seen_videos = SeenVideoStore(database_path, seen_videos_per_feed)
+
+
+def new_videos_in(feed_url, feed):
+    """คืนวิดีโอใหม่ของ feed เรียงตามเวลาที่เผยแพร่"""
+    videos = [build_video_data(entry) for entry in feed.entries]
+
+    # First time we see a feed, remember its backlog instead of announcing it
+    if not seen_videos.has_feed(feed_url):
+        seen_videos.mark(feed_url, videos)
+        return []
+
+    new_videos = [(feed_url, video) for video in seen_videos.unseen(videos)]
+    new_videos.sort(key=lambda item: item[1]["published_ts"])
+    return new_videos
+
+
+# Video ids whose announcement is being sent right now
+announcing = set()
+
+
+async def announce_videos(items):
+    """ประกาศวิดีโอตามลำดับ บันทึกว่าเห็นแล้วเฉพาะคลิปที่ส่งสำเร็จ"""
+    failed = []
+    for feed_url, video in items:
+        # Another feed's poll may be announcing it, or have done so while we awaited
+        if video["id"] in announcing or not seen_videos.unseen([video]):
+            continue
+        announcing.add(video["id"])
+        try:
+            if await send_showcase_video(video):
+                seen_videos.mark(feed_url, [video])
+            else:
+                failed.append(feed_url)
+        except discord.HTTPException as e:
+            print(f"Failed to announce video {video['id']}: {e}")
+            failed.append(feed_url)
+        finally:
+            announcing.discard(video["id"])
+
+    if failed:
+        # The feed body is unchanged next time, so drop its ETag or a 304 would hide the retry
+        for feed_url in set(failed):
+            feed_poller.forget(feed_url)
+        raise RuntimeError(f"{len(failed)} video(s) could not be announced")
+
+
+class FeedState:
+    def __init__(self, url, interval):
+        self.url = url
+        self.interval = interval
+        self.next_due = 0.0
+        self.errors = 0
+        self.polls = 0
+        self.upload_gap = None
+        self.last_success = None
+        self.last_new_video = None
+        self.last_error = None
+        self.awaiting = set()
+        self.push_retries = 0
+
+
+class FeedScheduler:
+    def __init__(self, poller, jobs, feed_urls, min_interval, max_interval, concurrency):
+        self.poller = poller
+        self.jobs = jobs
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.feeds = {url: FeedState(url, min_interval) for url in feed_urls}
+        self.running = set()
+        jobs.register("feed_poll", self._on_due)
+
+    def set_bounds(self, min_interval, max_interval):
+        """เปลี่ยนช่วง interval ต่ำสุด/สูงสุด (เช่นเมื่อเปิดใช้ WebSub)"""
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        for state in self.feeds.values():
+            state.interval = min(max(state.interval, min_interval), max_interval)
+
+    def start(self):
+        """เริ่ม poll โดยกระจายรอบแรกของทุก feed ให้ไม่ยิงพร้อมกัน"""
+        now = time.time()
+        for state in self.feeds.values():
+            self._schedule(state, now + random.uniform(0, self.min_interval))
+
+    def _schedule(self, state, due):
+        state.next_due = due
+        # Polls are cheap to re-create on startup, so they are not persisted
+        self.jobs.schedule("feed_poll", state.url, due, persist=False)
+
+    def _jittered(self, delay):
+        return delay * random.uniform(1 - feed_poll_jitter, 1 + feed_poll_jitter)
+
+    def poll_soon(self, url, video_ids):
+        """poll feed เร็วขึ้นจนกว่าวิดีโอที่ได้รับจาก WebSub push จะปรากฏใน feed"""
+        state = self.feeds.get(url)
+        if state is None:
+            return
+        state.awaiting.update(video_ids)
+        state.push_retries = 0
+        if url in self.running:
+            # The running poll reschedules itself while videos are still awaited
+            return
+        due = time.time() + websub_poll_delay_seconds
+        if due < state.next_due:
+            self._schedule(state, due)
+
+    def _resolve_awaiting(self, state, feed):
+        if feed is not None:
+            state.awaiting -= {getattr(entry, "yt_videoid", None) for entry in feed.entries}
+        if state.awaiting:
+            state.awaiting -= seen_videos.seen_ids(state.awaiting)
+        if not state.awaiting:
+            state.push_retries = 0
+
+    def _push_retry_delay(self, state):
+        if state.push_retries >= websub_poll_max_retries:
+            print(f"Pushed videos {sorted(state.awaiting)} never appeared in {state.url}")
+            state.awaiting.clear()
+            state.push_retries = 0
+            return None
+        delay = min(websub_poll_delay_seconds * 2 ** state.push_retries, websub_poll_max_delay_seconds)
+        state.push_retries += 1
+        return delay
+
+    async def _on_due(self, url, payload):
+        state = self.feeds.get(url)
+        if state is None or url in self.running:
+            return
+        self.running.add(url)
+        await self._poll(state)
+
+    async def _poll(self, state):
+        try:
+            async with self.semaphore:
+                state.polls += 1
+                feed = await self.poller.fetch(state.url)
+                new_videos = new_videos_in(state.url, feed) if feed is not None else []
+                await announce_videos(new_videos)
+        except Exception as e:
+            state.errors += 1
+            state.last_error = repr(e)
+            delay = min(state.interval * 2 ** state.errors, feed_poll_max_backoff_seconds)
+            print(f"Feed poll failed for {state.url}: {e!r} (retry in {delay:.0f}s)")
+        else:
+            state.errors = 0
+            state.last_error = None
+            state.last_success = time.time()
+            if new_videos:
+                state.last_new_video = time.time()
+            self._adapt(state, feed)
+            self._resolve_awaiting(state, feed)
+            delay = state.interval
+        finally:
+            self.running.discard(state.url)
+
+        delay = self._jittered(delay)
+        if state.awaiting:
+            retry = self._push_retry_delay(state)
+            if retry is not None:
+                delay = min(delay, retry)
+        self._schedule(state, time.time() + delay)
+
+    def _adapt(self, state, feed):
+        """ปรับ interval ตามความถี่การอัปโหลดของช่อง"""
+        if feed is not None:
+            stamps = sorted(
+                calendar.timegm(entry.published_parsed)
+                for entry in feed.entries
+                if getattr(entry, "published_parsed", None)
+            )
+            if len(stamps) >= 2:
+                # A channel that has gone quiet counts as slower than its history
+                state.upload_gap = max(
+                    (stamps[-1] - stamps[0]) / (len(stamps) - 1),
+                    time.time() - stamps[-1],
+                )
+            elif stamps:
+                state.upload_gap = time.time() - stamps[0]
+            else:
+                state.upload_gap = None
+
+        target = state.upload_gap * feed_poll_gap_fraction if state.upload_gap else self.max_interval
+        state.interval = min(max(target, self.min_interval), self.max_interval)
+
+    def stats(self):
+        now = time.time()
+        return [
+            {
+                "url": state.url,
+                "interval": state.interval,
+                "next_in": max(state.next_due - now, 0),
+                "errors": state.errors,
+                "polls": state.polls,
+                "last_success": state.last_success,
+                "last_new_video": state.last_new_video,
+                "last_error": state.last_error,
+                "awaiting": len(state.awaiting),
+            }
+            for state in self.feeds.values()
+        ]
+
+
+feed_scheduler = FeedScheduler(
+    feed_poller,
+    job_scheduler,
+    list(feed_url_youtube.values()),
+    feed_poll_min_seconds,
+    feed_poll_max_seconds,
+    feed_poll_concurrency,
+)
+
+
+youtube_feed_by_channel = {
+    url.rsplit("channel_id=", 1)[-1]: url for url in feed_url_youtube.values()
+}
+
+
+async def handle_websub_push(body):
+    """ใช้ push เป็นสัญญาณให้ poll feed ของช่องนั้นทันที (ไม่เชื่อข้อมูลวิดีโอใน body)"""
+    try:
+        feed = await asyncio.to_thread(feedparser.parse, body)
+        pushed = {}
+        for entry in feed.entries:
+            # Only the ids are used; titles and links always come from the polled feed
+            feed_url = youtube_feed_by_channel.get(getattr(entry, "yt_channelid", None))
+            video_id = getattr(entry, "yt_videoid", None)
+            if feed_url and video_id:
+                pushed.setdefault(feed_url, set()).add(video_id)
+        for feed_url, video_ids in pushed.items():
+            feed_scheduler.poll_soon(feed_url, video_ids)
+    except Exception as e:
+        print(f"WebSub push handling failed: {e!r}")
+
+
+def on_websub_push(body):
+    """ถูกเรียกจาก thread ของ web server ส่งงานต่อให้ event loop ของบอท"""
+    if not bot.is_ready():
+        # The fallback poll picks the video up once the bot is connected
+        return
+    asyncio.run_coroutine_threadsafe(handle_websub_push(body), bot.loop)
+
+
+async def websub_subscribe(topic):
+    """ขอ subscribe หรือต่ออายุ lease ของ topic กับ hub"""
+    form = {
+        "hub.callback": websub_callback_url,
+        "hub.topic": topic,
+        "hub.mode": "subscribe",
+        "hub.verify": "async",
+        "hub.lease_seconds": str(websub_lease_seconds),
+        "hub.secret": websub_secret,
     }
 
+    expect_websub_verification(topic, websub_lease_seconds)
+    res = await youtube_client.request("POST", websub_hub_url, raw=True, data=form)
+    if res.status not in (202, 204):
+        raise RuntimeError(f"WebSub hub returned HTTP {res.status}")
+
 
 def build_youtube_embed(data):
     """สร้าง Embed ใช้ประกาศ Video ใหม่"""
@@ -467,10 +1995,10 @@ def build_youtube_embed(data):
 
 
 async def send_showcase_video(video_data):
-    """ส่งวิดีโอลง Showcase Channel"""
+    """ส่งวิดีโอลง Showcase Channel คืน False ถ้าไม่พบ channel"""
     channel = bot.get_channel(showcase_channel_id)
     if not channel:
-        return
+        return False
     
     embed = build_youtube_embed(video_data)
     view = VideoButtons(video_data["link"], youtube_xecret_hub_channel)
@@ -480,6 +2008,7 @@ async def send_showcase_video(video_data):
         embed=embed,
         view=view
     )
+    return True
     
 # =========================
 # 10) Event System
@@ -492,22 +2021,165 @@ def resolve_role(guild, allowed_role_str):
     return discord.utils.get(guild.roles, name=allowed_role_str.replace("@", "").strip())
 
 
-def check_allowed_role(user, guild, allowed_role):
-    """เช็คว่า user มีสิทธิ์เข้าร่วม event หรือไม่"""
-    if allowed_role.lower() == "skip":
+def check_allowed_role(user, guild, config):
+    """เช็คว่า user มีสิทธิ์เข้าร่วม event หรือไม่ จาก role id ที่ resolve ไว้ตอนสร้าง event"""
+    if "allowed_role_id" not in config:
+        # Events created before role ids were stored are resolved once, then cached
+        allowed_role = config.get("allowed_role", "skip")
+        if allowed_role.lower() == "skip":
+            config["allowed_role_id"] = None
+        else:
+            role_obj = resolve_role(guild, allowed_role)
+            # 0 matches no role, like the old check for a role that no longer exists
+            config["allowed_role_id"] = role_obj.id if role_obj else 0
+
+    role_id = config["allowed_role_id"]
+    if role_id is None:
         return True
-    role_obj = resolve_role(guild, allowed_role)
-    return role_obj in user.roles if role_obj else False
+    return user.get_role(role_id) is not None
+
+
+class MessageEditCoalescer:
+    def __init__(self, debounce, min_interval):
+        self.debounce = debounce
+        self.min_interval = min_interval
+        self.pending = {}
+        self.last_edit = {}
+        self.tasks = {}
+        self.edits = 0
+        self.coalesced = 0
+
+    def request(self, message, render):
+        """ขอแก้ไข message ถ้ามีคำขอรออยู่แล้วจะรวมเป็นครั้งเดียว"""
+        if message.id in self.pending:
+            self.coalesced += 1
+        # render is called at flush time so the edit always shows the latest state
+        self.pending[message.id] = (message, render)
+        if message.id not in self.tasks:
+            self.tasks[message.id] = asyncio.create_task(self._flush(message.id))
+
+    def cancel(self, message_id):
+        """ยกเลิกการแก้ไขที่ค้างอยู่ (เช่นก่อนแก้ไขครั้งสุดท้ายตอนจบ event)"""
+        self.pending.pop(message_id, None)
+        self.last_edit.pop(message_id, None)
+        task = self.tasks.pop(message_id, None)
+        if task:
+            task.cancel()
+
+    async def _flush(self, message_id):
+        try:
+            await asyncio.sleep(self.debounce)
+            while message_id in self.pending:
+                wait = self.last_edit.get(message_id, 0) + self.min_interval - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                message, render = self.pending.pop(message_id)
+                self.last_edit[message_id] = time.monotonic()
+                try:
+                    await message.edit(**render())
+                    self.edits += 1
+                except discord.HTTPException as e:
+                    print(f"Failed to edit message {message_id}: {e}")
+        finally:
+            if self.tasks.get(message_id) is asyncio.current_task():
+                del self.tasks[message_id]
+
+
+event_editor = MessageEditCoalescer(event_edit_debounce_seconds, event_edit_min_interval_seconds)
+
+
+class EventStore:
+    schema = """
+        CREATE TABLE IF NOT EXISTS events (
+            message_id INTEGER PRIMARY KEY,
+            ends_at    INTEGER NOT NULL,
+            status     TEXT NOT NULL,
+            config     TEXT NOT NULL,
+            winners    TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_events_due ON events(status, ends_at);
+        CREATE TABLE IF NOT EXISTS event_entries (
+            message_id INTEGER NOT NULL,
+            user_id    INTEGER NOT NULL,
+            PRIMARY KEY (message_id, user_id)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+
+    def _connect(self):
+        if self.conn is None:
+            self.conn = open_database(self.path)
+            self.conn.executescript(self.schema)
+        return self.conn
+
+    def create(self, message_id, config):
+        """บันทึก event ใหม่"""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO events VALUES (?, ?, 'active', ?, NULL)",
+                (message_id, config["ends_at"], json.dumps(config)),
+            )
+
+    def active(self):
+        """คืน event ที่ยังไม่จบทั้งหมด พร้อม config"""
+        rows = self._connect().execute(
+            "SELECT message_id, config FROM events WHERE status = 'active'"
+        ).fetchall()
+        return [(message_id, json.loads(config)) for message_id, config in rows]
+
+    def entries(self, message_id):
+        """คืนผู้เข้าร่วมทั้งหมดของ event"""
+        rows = self._connect().execute(
+            "SELECT user_id FROM event_entries WHERE message_id = ?", (message_id,)
+        )
+        return {row[0] for row in rows}
+
+    def add_entry(self, message_id, user_id):
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO event_entries VALUES (?, ?)", (message_id, user_id))
+
+    def remove_entry(self, message_id, user_id):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "DELETE FROM event_entries WHERE message_id = ? AND user_id = ?", (message_id, user_id)
+            )
+
+    def finish(self, message_id, winners):
+        """ปิด event และบันทึกผู้ชนะ"""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "UPDATE events SET status = 'finished', winners = ? WHERE message_id = ?",
+                (json.dumps(winners), message_id),
+            )
+            # Winners are kept on the event row; the entrant list is no longer needed
+            conn.execute("DELETE FROM event_entries WHERE message_id = ?", (message_id,))
+
+
+event_store = EventStore(database_path)
+
 
+def cache_event_message(message_id, message):
+    """เก็บ message/embed ของ event ที่กู้คืนหลังรีสตาร์ท ตอนมีคนกดปุ่มครั้งแรก"""
+    if message_id not in event_messages and message is not None:
+        event_messages[message_id] = message
+        event_embeds[message_id] = message.embeds[0]
 
-def build_event_embed(text, user, duration_minutes, max_winners):
+
+def build_event_embed(text, user, ends_at, max_winners):
     """สร้าง Embed Event ก่อนเริ่ม"""
     embed = discord.Embed(
         title=f"🎁 Xecret Hub - Event | {text} Giveaway!",
         url=discord_link,
         description=(
             f"After you win, go to {support_ticket} and submit proof.\n\n"
-            f"Ends: {duration_minutes} minutes\n"
+            f"Ends: <t:{ends_at}:R>\n"
             f"Entries: 0\n"
             f"Winners: {max_winners}"
         ),
@@ -535,69 +2207,99 @@ def build_event_embed(text, user, duration_minutes, max_winners):
     return embed
 
 
-def update_event_embed(embed, entries, duration_minutes, winners_text="None"):
-    """อัปเดตจำนวนคนเข้าร่วม + เวลาที่เหลือ"""
+def update_event_embed(embed, entries, ends_at, winners_text="None"):
+    """อัปเดตจำนวนคนเข้าร่วม (เวลานับถอยหลัง Discord แสดงเองจาก timestamp)"""
     embed.description = (
         f"After you win, go to {support_ticket} and submit proof.\n\n"
-        f"Ends: {duration_minutes}\n"
+        f"Ends: <t:{ends_at}:R>\n"
         f"Entries: {entries}\n"
         f"Winners: {winners_text}"
     )
     return embed
 
 
-async def finish_event(interaction, message, entries, max_winners, text, user):
-    """สุ่มผู้ชนะและประกาศ"""
-    winners = random.sample(entries, min(max_winners, len(entries)))
-    event_winners[message.id] = winners
-    winner_mentions = ", ".join(f"<@{uid}>" for uid in winners)
+async def finish_event(message_id):
+    """สุ่มผู้ชนะและประกาศ (ใช้ channel ที่บันทึกไว้ จึงทำงานได้หลังรีสตาร์ท)"""
+    event_active[message_id] = False
+    config = event_configs.pop(message_id)
+    entries = event_entries.pop(message_id, set())
+
+    winners = random.sample(list(entries), min(config["max_winners"], len(entries)))
+    event_winners[message_id] = winners
+    # Mark it finished before announcing so a crash can't announce twice
+    event_store.finish(message_id, winners)
 
-    embed = message.embeds[0]
+    # Drop any queued entry-count edit so it can't overwrite the result
+    event_editor.cancel(message_id)
+    embed = event_embeds.pop(message_id, None)
+    message = event_messages.pop(message_id, None)
+
+    channel = bot.get_channel(config["channel_id"])
+    if channel is None:
+        try:
+            channel = await bot.fetch_channel(config["channel_id"])
+        except discord.HTTPException as e:
+            print(f"Event {message_id}: channel unavailable ({e})")
+            return
+
+    winner_mentions = ", ".join(f"<@{uid}>" for uid in winners) or "None"
     now = datetime.now().strftime("%d/%m/%Y at %I:%M %p")
 
-    embed.description = (
-        f"After you win, go to {support_ticket} and submit proof.\n\n"
-        f"Ended: {now}\n"
-        f"Entries: {len(entries)}\n"
-        f"Winners: {winner_mentions}"
-    )
+    try:
+        if message is None:
+            message = await channel.fetch_message(message_id)
+        embed = embed or message.embeds[0]
 
-    embed.set_author(
-        name=f"{user.display_name} has created a giveaway activity",
-        url=f"https://discord.com/users/{user.id}",
-        icon_url=user.display_avatar.url,
-    )
+        embed.description = (
+            f"After you win, go to {support_ticket} and submit proof.\n\n"
+            f"Ended: {now}\n"
+            f"Entries: {len(entries)}\n"
+            f"Winners: {winner_mentions}"
+        )
 
-    await message.edit(embed=embed)
+        embed.set_author(
+            name=f"{config['host_name']} has created a giveaway activity",
+            url=f"https://discord.com/users/{config['host_id']}",
+            icon_url=config["host_avatar"],
+        )
+
+        # The buttons are not re-registered after a restart, so remove them even with no entries
+        await message.edit(embed=embed, view=None)
+    except discord.HTTPException as e:
+        # The event message may have been deleted; still announce the winners
+        print(f"Event {message_id}: failed to update message ({e})")
+
+    if not entries:
+        await channel.send("The event has ended, but no one joined.")
+        return
 
     for uid in winners:
-        await interaction.channel.send(
-            f"🎉 Congratulations <@{uid}>! You won the giveaway **{text}**!"
+        await channel.send(
+            f"🎉 Congratulations <@{uid}>! You won the giveaway **{config['text']}**!"
         )
 
 
-async def update_event_timer(message, message_id, duration_minutes):
-    """อัปเดตเวลานับถอยหลังทุก 1 วินาที"""
-    total_seconds = duration_minutes * 60
+async def on_event_due(message_id, payload):
+    """ถูกเรียกจาก job_scheduler เมื่อถึงเวลาจบ event"""
+    if int(message_id) in event_configs:
+        await finish_event(int(message_id))
 
-    for remaining in range(total_seconds, 0, -1):
-        if not event_active.get(message_id, False):
-            break
 
-        embed = message.embeds[0]
-        entries = len(event_entries.get(message_id, []))
-        minutes_left = remaining // 60
-        seconds_left = remaining % 60
+job_scheduler.register("event_end", on_event_due)
 
-        embed.description = (
-            f"After you win, go to {support_ticket} and submit proof.\n\n"
-            f"Ends: {minutes_left:02d}:{seconds_left:02d}\n"
-            f"Entries: {entries}\n"
-            f"Winners: {event_configs.get(message_id, {}).get('max_winners', 0)}"
-        )
 
-        await message.edit(embed=embed)
-        await asyncio.sleep(1)
+def render_event_entries(message_id):
+    """คืนฟังก์ชันสร้าง embed ล่าสุดของ event สำหรับ event_editor"""
+    def render():
+        config = event_configs[message_id]
+        embed = update_event_embed(
+            event_embeds[message_id],
+            len(event_entries[message_id]),
+            config["ends_at"],
+            config["max_winners"],
+        )
+        return {"embed": embed}
+    return render
 
 # =========================
 # 11) Embed Builders (Info/Script)
@@ -691,6 +2393,9 @@ def build_user_info_embed(interaction, user, target_user=None):
         color=discord.Color.blurple()
     )
 
+    if isinstance(user, StaleRecord):
+        embed.description += "\n⚠️ Luarmor is degraded right now, showing the last known data."
+
     embed.set_author(
         name=f"📊 {target.display_name}’s Information",
         url=f"https://discord.com/users/{target.id}",
@@ -711,6 +2416,13 @@ def build_user_info_embed(interaction, user, target_user=None):
 # =========================
 # 12) Logs
 # =========================
+async def reply_error(interaction, message):
+    if interaction.response.is_done():
+        await interaction.followup.send(message, ephemeral=True)
+    else:
+        await interaction.response.send_message(message, ephemeral=True)
+
+
 def send_purchase_log(interaction, status_text, key):
     channel = interaction.guild.get_channel(channel_id_purchase)
     if not channel:
@@ -759,11 +2471,125 @@ def send_whitelist_log(guild, member, description, color):
 # =========================
 # Start
 # =========================
+@bot.tree.error
+async def on_app_command_error(interaction: discord.Interaction, error):
+    original = getattr(error, "original", error)
+    if isinstance(original, UpstreamUnavailable):
+        await reply_error(interaction, str(original))
+        return
+    traceback.print_exception(type(error), error, error.__traceback__)
+
+
+class ApiView(discord.ui.View):
+    async def on_error(self, interaction: discord.Interaction, error, item):
+        if isinstance(error, UpstreamUnavailable):
+            await reply_error(interaction, str(error))
+            return
+        await super().on_error(interaction, error, item)
+
+async def warm_up():
+    async def run(name, coro):
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(coro, warmup_timeout_seconds)
+            print(f"Warm-up: {name} ready in {time.monotonic() - started:.2f}s")
+        except Exception as e:
+            print(f"Warm-up: {name} failed ({e!r}), will retry on the next sync")
+
+    await asyncio.gather(
+        run("script catalog", loader_sync.refresh()),
+        run("key index", keys_sync.refresh()),
+        run("user mirror", sync_all_users()),
+    )
+
+
+@tasks.loop(minutes=user_mirror_sync_minutes)
+async def sync_user_mirror():
+    # The first run is covered by warm_up
+    if sync_user_mirror.current_loop == 0:
+        return
+    try:
+        count = await sync_all_users()
+        if count is not None:
+            print(f"User mirror synced: {count} users")
+    except Exception as e:
+        print(f"User mirror sync failed: {e}")
+
+
+@tasks.loop(seconds=jsonbin_sync_seconds)
+async def sync_jsonbin_records():
+    if sync_jsonbin_records.current_loop == 0:
+        return
+    results = await asyncio.gather(
+        *(record.refresh() for record in jsonbin_records),
+        return_exceptions=True,
+    )
+    for record, result in zip(jsonbin_records, results):
+        if isinstance(result, Exception):
+            print(f"JSONBin {record.name} sync failed: {result}")
+        elif result:
+            print(f"JSONBin {record.name} updated")
+
+
+def restore_events():
+    # Reload running giveaways and re-attach their buttons to the existing messages
+    restored = 0
+    for message_id, config in event_store.active():
+        event_configs[message_id] = config
+        event_entries[message_id] = event_store.entries(message_id)
+        event_active[message_id] = True
+        bot.add_view(EventView(message_id), message_id=message_id)
+        # Overdue events are finished on the scheduler's first pass
+        job_scheduler.schedule("event_end", message_id, config["ends_at"])
+        restored += 1
+    if restored:
+        print(f"Restored {restored} running events")
+
+
+def command_tree_fingerprint(tree):
+    payload = []
+    for command in tree.get_commands():
+        try:
+            payload.append(command.to_dict(tree))
+        except TypeError:
+            # discord.py < 2.4 takes no tree argument
+            payload.append(command.to_dict())
+    payload.sort(key=lambda data: (data.get("type", 1), data["name"]))
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+async def sync_command_tree():
+    state_key = f"command_tree_fingerprint:{bot.application_id}"
+    fingerprint = command_tree_fingerprint(bot.tree)
+    if bot_state.get(state_key) == fingerprint:
+        print("Command tree unchanged, skipping sync")
+        return False
+
+    await bot.tree.sync()
+    bot_state.set(state_key, fingerprint)
+    print("Command tree synced")
+    return True
+
+
 @bot.event
 async def on_ready():
-    preload_latest_video_ids()
-    check_youtube_feeds.start()
-    await bot.tree.sync()
+    global startup_done
+
+    # on_ready fires again after gateway reconnects; only run startup work once
+    if not startup_done:
+        startup_done = True
+        asyncio.create_task(warm_up())
+        if websub_enabled:
+            # Push delivers uploads; polling only covers missed notifications
+            feed_scheduler.set_bounds(feed_fallback_min_seconds, feed_fallback_max_seconds)
+            renew_websub_subscriptions.start()
+        restore_events()
+        feed_scheduler.start()
+        job_scheduler.start()
+        sync_user_mirror.start()
+        sync_jsonbin_records.start()
+        await sync_command_tree()
+
     await bot.change_presence(
         status=discord.Status.dnd,
         activity=discord.Activity(
@@ -781,26 +2607,29 @@ class VideoButtons(discord.ui.View):
         self.add_item(discord.ui.Button(label="Watch Video", url=video_url))
         self.add_item(discord.ui.Button(label="Visit Channel", url=channel_url))
 
-@tasks.loop(minutes=5)
-async def check_youtube_feeds():
-    for lang, url in feed_url_youtube.items():
-        video = await fetch_latest_video(url)
-        if not video:
-            continue
-
-        if video["id"] in sent_video_ids:
+@tasks.loop(minutes=websub_renew_check_minutes)
+async def renew_websub_subscriptions():
+    now = time.time()
+    for topic in feed_url_youtube.values():
+        # Unverified topics have no lease yet and are re-requested every check
+        expiry = websub_lease_expiry(topic)
+        if expiry and expiry - now > websub_renew_margin_seconds:
             continue
-
-        sent_video_ids.add(video["id"])
-
-        await send_showcase_video(video)
+        try:
+            await websub_subscribe(topic)
+        except Exception as e:
+            print(f"WebSub subscribe failed for {topic}: {e!r}")
 
 # ============================
 # Event
 # ============================
 class JoinEventButton(discord.ui.Button):
     def __init__(self, message_id):
-        super().__init__(label="🤝 Join Event", style=discord.ButtonStyle.success)
+        super().__init__(
+            label="🤝 Join Event",
+            style=discord.ButtonStyle.success,
+            custom_id=f"event_join:{message_id}",
+        )
         self.message_id = message_id
 
     async def callback(self, interaction: discord.Interaction):
@@ -811,8 +2640,7 @@ class JoinEventButton(discord.ui.Button):
             await interaction.response.send_message("This event has already ended.", ephemeral=True)
             return
 
-        allowed_role = event_configs.get(msg_id, {}).get("allowed_role", "skip")
-        if not check_allowed_role(user, interaction.guild, allowed_role):
+        if not check_allowed_role(user, interaction.guild, event_configs[msg_id]):
             await interaction.response.send_message("Your role doesn't allow you to join this event.", ephemeral=True)
             return
 
@@ -820,20 +2648,19 @@ class JoinEventButton(discord.ui.Button):
             await interaction.response.send_message("You've already joined this event!", ephemeral=True)
             return
 
-        event_entries[msg_id].append(user.id)
-        message = await interaction.channel.fetch_message(msg_id)
-        embed = message.embeds[0]
-
-        entries = len(event_entries[msg_id])
-        duration_minutes = event_configs[msg_id]["duration_minutes"]
-
-        embed = update_event_embed(embed, entries, duration_minutes)
-        await message.edit(embed=embed)
+        event_entries[msg_id].add(user.id)
+        event_store.add_entry(msg_id, user.id)
         await interaction.response.send_message("You've joined the event!", ephemeral=True)
+        cache_event_message(msg_id, interaction.message)
+        event_editor.request(event_messages[msg_id], render_event_entries(msg_id))
 
 class LeaveEventButton(discord.ui.Button):
     def __init__(self, message_id):
-        super().__init__(label="👋 Leave Event", style=discord.ButtonStyle.danger)
+        super().__init__(
+            label="👋 Leave Event",
+            style=discord.ButtonStyle.danger,
+            custom_id=f"event_leave:{message_id}",
+        )
         self.message_id = message_id
 
     async def callback(self, interaction: discord.Interaction):
@@ -844,8 +2671,7 @@ class LeaveEventButton(discord.ui.Button):
             await interaction.response.send_message("This event has already ended.", ephemeral=True)
             return
 
-        allowed_role = event_configs.get(msg_id, {}).get("allowed_role", "skip")
-        if not check_allowed_role(user, interaction.guild, allowed_role):
+        if not check_allowed_role(user, interaction.guild, event_configs[msg_id]):
             await interaction.response.send_message("Your role doesn't allow you to leave this event.", ephemeral=True)
             return
 
@@ -853,16 +2679,11 @@ class LeaveEventButton(discord.ui.Button):
             await interaction.response.send_message("You haven't joined this event yet.", ephemeral=True)
             return
 
-        event_entries[msg_id].remove(user.id)
-        message = await interaction.channel.fetch_message(msg_id)
-        embed = message.embeds[0]
-
-        entries = len(event_entries[msg_id])
-        duration_minutes = event_configs[msg_id]["duration_minutes"]
-
-        embed = update_event_embed(embed, entries, duration_minutes)
-        await message.edit(embed=embed)
+        event_entries[msg_id].discard(user.id)
+        event_store.remove_entry(msg_id, user.id)
         await interaction.response.send_message("You've left the event.", ephemeral=True)
+        cache_event_message(msg_id, interaction.message)
+        event_editor.request(event_messages[msg_id], render_event_entries(msg_id))
 
 class EventView(discord.ui.View):
     def __init__(self, message_id):
@@ -884,16 +2705,23 @@ async def set_event(interaction: discord.Interaction, text: str, max_winners: in
     allowed_role_clean = allowed_role.strip()
 
     if allowed_role_clean.lower() == "skip":
+        allowed_role_id = None
         role_event = discord.utils.get(interaction.guild.roles, name="Events Ping")
         ping_text = f"@here {role_event.mention}" if role_event else "@here"
     else:
         role_obj = resolve_role(interaction.guild, allowed_role_clean)
-        ping_text = role_obj.mention if role_obj else "@here"
+        if not role_obj:
+            # Nobody could ever join an event for a role that doesn't exist
+            await interaction.response.send_message(f"Role `{allowed_role_clean}` not found.", ephemeral=True)
+            return
+        allowed_role_id = role_obj.id
+        ping_text = role_obj.mention
 
     msg = await interaction.channel.send(ping_text)
     await msg.delete()
 
-    embed = build_event_embed(text, user, duration_minutes, max_winners)
+    ends_at = int(time.time()) + duration_minutes * 60
+    embed = build_event_embed(text, user, ends_at, max_winners)
     message = await interaction.channel.send(embed=embed)
 
     view = EventView(message.id)
@@ -902,36 +2730,30 @@ async def set_event(interaction: discord.Interaction, text: str, max_winners: in
     event_configs[message.id] = {
         "max_winners": max_winners,
         "duration_minutes": duration_minutes,
+        "ends_at": ends_at,
         "allowed_role": allowed_role_clean,
+        "allowed_role_id": allowed_role_id,
+        "text": text,
+        "channel_id": interaction.channel.id,
+        "host_id": user.id,
+        "host_name": user.display_name,
+        "host_avatar": user.display_avatar.url,
     }
+    event_store.create(message.id, event_configs[message.id])
+    job_scheduler.schedule("event_end", message.id, ends_at)
 
-    event_entries[message.id] = []
+    event_entries[message.id] = set()
+    event_messages[message.id] = message
+    event_embeds[message.id] = embed
     event_active[message.id] = True
 
+    # job_scheduler ends the event once ends_at passes, even across restarts
     await interaction.response.send_message("Event has been created!", ephemeral=True)
 
-    asyncio.create_task(update_event_timer(message, message.id, duration_minutes))
-
-    await asyncio.sleep(duration_minutes * 60)
-    event_active[message.id] = False
-
-    if not event_entries[message.id]:
-        await interaction.channel.send("The event has ended, but no one joined.")
-        return
-
-    await finish_event(
-        interaction,
-        message,
-        event_entries[message.id],
-        max_winners,
-        text,
-        user
-    )
-
 # ============================
 # Script Panal
 # ============================
-class PanelView(discord.ui.View):
+class PanelView(ApiView):
     def __init__(self):
         super().__init__(timeout=None)
 
@@ -950,23 +2772,24 @@ class PanelView(discord.ui.View):
         self.add_item(InfosButton(row=1))
 
 class ScriptDropdown(discord.ui.Select):
-    def __init__(self):
+    def __init__(self, scripts_data, options, page, total_pages):
 
-        scripts_data = fetch_scripts(response)
-        options = build_select_options(scripts_data)
+        placeholder = "Choose your script"
+        if total_pages > 1:
+            placeholder += f" (page {page + 1}/{total_pages})"
 
         super().__init__(
-            placeholder="Choose your script",
+            placeholder=placeholder,
             min_values=1,
             max_values=1,
-            options=options,
+            options=list(options),
         )
 
         self.scripts_data = scripts_data
 
     async def callback(self, interaction: discord.Interaction):
 
-        user_key = fetch_user_key(interaction)
+        user_key = await fetch_user_key(interaction)
         if not user_key:
             return
 
@@ -976,10 +2799,25 @@ class ScriptDropdown(discord.ui.Select):
         embed = build_script_embed(interaction, script_info, user_key)
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
-class ScriptDropdownView(discord.ui.View):
-    def __init__(self):
+class ScriptPageButton(discord.ui.Button):
+    def __init__(self, label, snapshot, page, disabled):
+        super().__init__(label=label, style=discord.ButtonStyle.gray, disabled=disabled, row=1)
+        self.snapshot = snapshot
+        self.page = page
+
+    async def callback(self, interaction: discord.Interaction):
+        await interaction.response.edit_message(view=ScriptDropdownView(self.snapshot, self.page))
+
+class ScriptDropdownView(ApiView):
+    def __init__(self, snapshot, page=0):
         super().__init__(timeout=None)
-        self.add_item(ScriptDropdown())
+        scripts_data, pages = snapshot
+        page = max(0, min(page, len(pages) - 1))
+
+        self.add_item(ScriptDropdown(scripts_data, pages[page], page, len(pages)))
+        if len(pages) > 1:
+            self.add_item(ScriptPageButton("◀ Previous", snapshot, page - 1, disabled=page == 0))
+            self.add_item(ScriptPageButton("Next ▶", snapshot, page + 1, disabled=page == len(pages) - 1))
 
 class GetScriptButton(discord.ui.Button):
     def __init__(self, row: int = 0):
@@ -992,7 +2830,7 @@ class GetScriptButton(discord.ui.Button):
 
     async def callback(self, interaction: discord.Interaction):
 
-        user_key = fetch_user_key(interaction)
+        user_key = await fetch_user_key(interaction)
 
         if not user_key:
             await interaction.response.send_message(
@@ -1001,9 +2839,20 @@ class GetScriptButton(discord.ui.Button):
             )
             return
 
+        if not loader_sync.loaded:
+            await loader_sync.refresh()
+
+        snapshot = script_pages.snapshot()
+        if not snapshot[1]:
+            await interaction.response.send_message(
+                "No scripts are available right now.",
+                ephemeral=True
+            )
+            return
+
         await interaction.response.send_message(
             "Please choose your script below:",
-            view=ScriptDropdownView(),
+            view=ScriptDropdownView(snapshot),
             ephemeral=True,
         )
 
@@ -1022,27 +2871,62 @@ class RedeemKeyModal(discord.ui.Modal, title="Redeem a Key"):
 
         key = self.key_input.value.strip()
 
-        record = load_key_database()
-        if not record:
+        if redemption_ledger.is_used(key):
+            status_text = "Invalid or already used key."
+            await interaction.followup.send(status_text, ephemeral=True)
+            await send_purchase_log(interaction, status_text, key)
+            return
+
+        matched_key = await match_redeem_key(key)
+        if not key_index.loaded:
             status_text = "Failed to load key database."
             await interaction.followup.send(status_text, ephemeral=True)
             await send_purchase_log(interaction, status_text, key)
             return
 
-        matched_key = match_redeem_key(record, key)
         if not matched_key:
             status_text = "Invalid or already used key."
             await interaction.followup.send(status_text, ephemeral=True)
             await send_purchase_log(interaction, status_text, key)
             return
 
-        result = redeem_key_api(interaction, matched_key)
+        # Claim before calling Luarmor so concurrent submits of the same key can't both redeem
+        if not redemption_ledger.claim(key, interaction.user.id):
+            status_text = "Invalid or already used key."
+            await interaction.followup.send(status_text, ephemeral=True)
+            await send_purchase_log(interaction, status_text, key)
+            return
+
+        try:
+            response = await redeem_key_api(interaction, matched_key)
+        except UpstreamTimeout as e:
+            response, detail = None, repr(e.__cause__ or e)
+        except Exception as e:
+            # Refused before reaching Luarmor (breaker open, rate limited)
+            redemption_ledger.release(key, interaction.user.id, str(e))
+            raise
+        else:
+            detail = f"HTTP {response.status}"
+        invalidate_user(interaction.user.id)
+
+        result = response.data if response and isinstance(response.data, dict) else {}
+        # Timeouts, 5xx and unreadable 2xx bodies don't tell us whether the key was applied
+        if response is None or response.status >= 500 or (response.status < 300 and "success" not in result):
+            redemption_ledger.mark_unknown(key, interaction.user.id, detail)
+            status_text = "We couldn't confirm your redemption. Please open a ticket so staff can check it."
+            await interaction.followup.send(status_text, ephemeral=True)
+            await send_purchase_log(interaction, f"Redeem outcome unknown ({detail})", key)
+            return
+
         if not result.get("success"):
+            redemption_ledger.release(key, interaction.user.id, result.get("message"))
             status_text = f"Failed to redeem key: {result.get('message')}"
             await interaction.followup.send(status_text, ephemeral=True)
             await send_purchase_log(interaction, status_text, key)
             return
 
+        redemption_ledger.confirm(key, interaction.user.id)
+
         role = interaction.guild.get_role(buyer_role_id)
         if role:
             await interaction.user.add_roles(role, reason="Key redeemed successfully")
@@ -1052,6 +2936,12 @@ class RedeemKeyModal(discord.ui.Modal, title="Redeem a Key"):
 
         await send_purchase_log(interaction, status_text, key)
 
+    async def on_error(self, interaction: discord.Interaction, error):
+        if isinstance(error, UpstreamUnavailable):
+            await reply_error(interaction, str(error))
+            return
+        await super().on_error(interaction, error)
+
 class RedeemKeyButton(discord.ui.Button):
     def __init__(self, row: int = 0):
         super().__init__(
@@ -1075,7 +2965,7 @@ class GetBuyerRoleButton(discord.ui.Button):
 
     async def callback(self, interaction: discord.Interaction):
 
-        user_key = fetch_user_key(interaction)
+        user_key = await fetch_user_key(interaction)
 
         if not user_key:
             await interaction.response.send_message(
@@ -1134,12 +3024,13 @@ class ResetHWIDButton(discord.ui.Button):
             )
             return
 
-        user_key = fetch_user_key(interaction)
+        user_key = await fetch_user_key(interaction)
         if not user_key:
             await interaction.followup.send("You are not whitelisted.", ephemeral=True)
             return
 
-        result = await asyncio.to_thread(reset_hwid_api, user_key)
+        result = await reset_hwid_api(user_key)
+        invalidate_user(user_id)
 
         if result.get("success"):
             await interaction.followup.send("Successfully reset your HWID.", ephemeral=True)
@@ -1157,7 +3048,7 @@ class InfosButton(discord.ui.Button):
 
     async def callback(self, interaction: discord.Interaction):
 
-        user = fetch_user_data(interaction)
+        user = await fetch_user_data(interaction)
 
         if not user:
             await interaction.response.send_message(
@@ -1233,7 +3124,7 @@ async def set_panel(interaction: discord.Interaction):
 @is_support_or_admin()
 async def whitelist_infos(interaction: discord.Interaction, member: discord.Member):
     await interaction.response.defer(ephemeral=True)
-    user = fetch_user_data_from_id(member.id) 
+    user = await fetch_user_data_from_id(member.id, PRIORITY_STAFF)
 
     if not user:
         await interaction.followup.send(
@@ -1248,83 +3139,252 @@ async def whitelist_infos(interaction: discord.Interaction, member: discord.Memb
 # ============================
 # Generate Key
 # ============================
-def generate_key(length=32):
-    chars = string.ascii_letters + string.digits
-    return ''.join(random.choices(chars, k=length))
+KEY_LENGTH = 32
+KEY_BATCH_SIZE = 10000
+KEY_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZ234567"
+
+# 256 is a multiple of 32, so mapping every byte onto the alphabet keeps it unbiased
+_KEY_TRANSLATE = bytes(KEY_ALPHABET[i % len(KEY_ALPHABET)] for i in range(256))
+
+
+def generate_key_batch(count):
+    raw = os.urandom(count * KEY_LENGTH).translate(_KEY_TRANSLATE).decode()
+    return [raw[i:i + KEY_LENGTH] for i in range(0, len(raw), KEY_LENGTH)]
 
-def generate_keys(amount, days):
+
+def iter_generated_keys(amount, days, existing=None, start=1):
     if not isinstance(days, list):
         days = [days]
 
-    keys = {}
+    existing = existing if existing is not None else {}
+    seen = set()
     part_size = amount // len(days)
     remainder = amount % len(days)
 
-    key_count = 0
+    key_count = start - 1
     for d in days:
         count = part_size + (1 if remainder > 0 else 0)
         if remainder > 0:
             remainder -= 1
 
-        for _ in range(count):
-            key_count += 1
-            key_id = f"Key{key_count}"
-            keys[key_id] = {
-                "key": generate_key(),
-                "day": [d]
-            }
-
-    return keys
+        while count > 0:
+            for key in generate_key_batch(min(count, KEY_BATCH_SIZE)):
+                if key in seen or key in existing:
+                    continue
+                seen.add(key)
+                key_count += 1
+                count -= 1
+                yield f"Key{key_count}", key, d
+
+
+KEY_EXPORT_TIMEOUT = 900
+KEY_EXPORT_CHUNK_BYTES = 64 * 1024
+KEY_EXPORT_FLUSH_BYTES = 256 * 1024
+KEY_EXPORT_MAX_FILES = 10
+DEFAULT_FILESIZE_LIMIT = 10 * 1024 * 1024
+KEY_EXPORT_ENTRY_BYTES = {"txt": 34, "json": 60, "csv": 50, "ndjson": 70}
+
+
+class KeyExportWriter:
+    extensions = {"txt": "txt", "json": "json", "csv": "csv", "ndjson": "ndjson"}
+
+    def __init__(self, fmt, limit, compress):
+        self.fmt = fmt
+        self.limit = limit
+        self.compress = compress
+        self.parts = []
+        self.buffer = None
+        self._open_part()
+
+    def _open_part(self):
+        self.buffer = io.BytesIO()
+        self.stream = gzip.GzipFile(fileobj=self.buffer, mode="wb", compresslevel=6) if self.compress else self.buffer
+        self.pending = []
+        self.pending_bytes = 0
+        self.unflushed = 0
+        self.entries = 0
+        self.last_day = None
+        self._write(self._header())
+
+    def _header(self):
+        if self.fmt == "json":
+            return "{\n"
+        if self.fmt == "csv":
+            return "key_id,key,day\n"
+        return ""
+
+    def _footer(self):
+        return "\n}\n" if self.fmt == "json" else ""
+
+    def _line(self, key_id, key, day):
+        if self.fmt == "json":
+            sep = ",\n" if self.entries else ""
+            return f'{sep}  "{key_id}": {{"key": "{key}", "day": [{day}]}}'
+        if self.fmt == "csv":
+            return f"{key_id},{key},{day}\n"
+        if self.fmt == "ndjson":
+            return f'{{"key_id": "{key_id}", "key": "{key}", "day": {day}}}\n'
+        # TXT keeps one blank line between day groups
+        gap = "\n" if self.entries and day != self.last_day else ""
+        return f"{gap}{key}\n"
+
+    def _write(self, text):
+        # Keys are ASCII, so character counts are byte counts
+        self.pending.append(text)
+        self.pending_bytes += len(text)
+        if self.pending_bytes >= KEY_EXPORT_CHUNK_BYTES:
+            self._drain()
+
+    def _drain(self):
+        data = "".join(self.pending).encode()
+        self.pending = []
+        self.pending_bytes = 0
+        self.stream.write(data)
+        if self.compress:
+            self.unflushed += len(data)
+            if self.unflushed >= KEY_EXPORT_FLUSH_BYTES:
+                self.stream.flush(zlib.Z_SYNC_FLUSH)
+                self.unflushed = 0
+
+    def _size(self):
+        # Unflushed input can never compress to more than its own size, so this is an upper bound
+        return self.buffer.tell() + self.unflushed + self.pending_bytes
+
+    def _close_part(self):
+        self._write(self._footer())
+        self._drain()
+        if self.compress:
+            self.stream.close()
+        self.buffer.seek(0)
+        self.parts.append(self.buffer)
+
+    def write(self, key_id, key, day):
+        line = self._line(key_id, key, day)
+        if self.entries and self._size() + len(line) + len(self._footer()) + 64 > self.limit:
+            self._close_part()
+            self._open_part()
+            line = self._line(key_id, key, day)
+        self._write(line)
+        self.entries += 1
+        self.last_day = day
+
+    def finish(self, basename="keys"):
+        self._close_part()
+        ext = self.extensions[self.fmt] + (".gz" if self.compress else "")
+        if len(self.parts) == 1:
+            return [(f"{basename}.{ext}", self.parts[0])]
+        return [(f"{basename}_part{i}.{ext}", part) for i, part in enumerate(self.parts, 1)]
+
+
+def export_keys(batch, fmt, limit):
+    # Only compress when the plain file would not fit in one attachment
+    estimated = len(batch) * KEY_EXPORT_ENTRY_BYTES[fmt]
+    writer = KeyExportWriter(fmt, limit, compress=estimated > limit)
+    for key_id, key, d in batch:
+        writer.write(key_id, key, d)
+    return writer.finish()
+
+
+def group_export_parts(parts, limit):
+    # Discord caps the total upload size of one message, not just each file
+    groups, group, size = [], [], 0
+    for name, fp in parts:
+        part_size = fp.getbuffer().nbytes
+        if group and (size + part_size > limit or len(group) == KEY_EXPORT_MAX_FILES):
+            groups.append(group)
+            group, size = [], 0
+        group.append((name, fp))
+        size += part_size
+    if group:
+        groups.append(group)
+    return groups
 
 class KeyDownloadView(discord.ui.View):
-    def __init__(self, keys: dict):
-        super().__init__(timeout=None)
-        self.keys = keys
+    def __init__(self, batch: list):
+        super().__init__(timeout=KEY_EXPORT_TIMEOUT)
+        self.batch = batch
 
-    @discord.ui.button(label="Download TXT", style=discord.ButtonStyle.blurple)
-    async def download_txt(self, interaction: discord.Interaction, button: discord.ui.Button):
-        grouped = {}
-        for info in self.keys.values():
-            day = info["day"][0]
-            grouped.setdefault(day, []).append(info["key"])
+    async def on_timeout(self):
+        self.batch = None
+
+    async def export(self, interaction: discord.Interaction, fmt: str):
+        batch = self.batch
+        if batch is None:
+            await interaction.response.send_message(
+                "This key batch has expired or was already exported.", ephemeral=True
+            )
+            return
 
-        txt_blocks = []
-        for day, keys in grouped.items():
-            block = "\n".join(keys)
-            txt_blocks.append(block)
+        # Drop the batch before the upload so the view no longer pins it in memory
+        self.batch = None
+        self.stop()
+        await interaction.response.edit_message(
+            content=f"Exporting {len(batch)} key(s) as {fmt.upper()}...", view=None
+        )
 
-        txt_data = "\n\n".join(txt_blocks)  
+        limit = interaction.guild.filesize_limit if interaction.guild else DEFAULT_FILESIZE_LIMIT
+        parts = await asyncio.to_thread(export_keys, batch, fmt, limit)
+        del batch
 
-        file = discord.File(io.StringIO(txt_data), filename="keys.txt")
-        await interaction.response.send_message("Here is your TXT file:", file=file, ephemeral=True)
+        for group in group_export_parts(parts, limit):
+            files = [discord.File(fp, filename=name) for name, fp in group]
+            await interaction.followup.send(
+                f"Here is your {fmt.upper()} file{'s' if len(parts) > 1 else ''}:",
+                files=files,
+                ephemeral=True,
+            )
+
+    @discord.ui.button(label="Download TXT", style=discord.ButtonStyle.blurple)
+    async def download_txt(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.export(interaction, "txt")
 
     @discord.ui.button(label="Download JSON", style=discord.ButtonStyle.green)
     async def download_json(self, interaction: discord.Interaction, button: discord.ui.Button):
-        json_data = json.dumps(self.keys, indent=2)
-        file = discord.File(io.StringIO(json_data), filename="keys.json")
-        await interaction.response.send_message("Here is your JSON file:", file=file, ephemeral=True)
+        await self.export(interaction, "json")
+
+    @discord.ui.button(label="Download CSV", style=discord.ButtonStyle.gray)
+    async def download_csv(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.export(interaction, "csv")
+
+    @discord.ui.button(label="Download NDJSON", style=discord.ButtonStyle.gray)
+    async def download_ndjson(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.export(interaction, "ndjson")
 
 
 @bot.tree.command(
     name="generate-key",
-    description="Generate keys and download as .txt and .json (Minami Only)"
+    description="Generate keys and download as .txt, .json, .csv or .ndjson (Minami Only)"
 )
 @app_commands.describe(
     amount="Number of keys to generate",
-    day="Number of days per key (ex: 0 or 0,30)"
+    day="Number of days per key (ex: 0 or 0,30)",
+    publish="Also add the keys to the key database so they can be redeemed"
 )
 @is_support_or_admin()
-async def generate_key_command(interaction: discord.Interaction, amount: int, day: str):
+async def generate_key_command(interaction: discord.Interaction, amount: int, day: str, publish: bool = False):
     try:
         days = [int(d.strip()) for d in day.split(",")]
     except ValueError:
         await interaction.response.send_message("Invalid day format! Example: 0 or 0,30", ephemeral=True)
         return
 
-    generated_keys = generate_keys(amount, days)
-    await interaction.response.send_message(
-        f"Generated {amount} key(s) divided across {days} day(s). (Minami Only)",
-        view=KeyDownloadView(generated_keys),
+    await interaction.response.defer(ephemeral=True)
+
+    existing = key_index.by_key
+    start = next_key_number(keys_sync.record)
+    batch = await asyncio.to_thread(lambda: list(iter_generated_keys(amount, days, existing, start)))
+
+    status_text = f"Generated {amount} key(s) divided across {days} day(s). (Minami Only)"
+    if publish:
+        try:
+            batch = await publish_keys(batch)
+            status_text += f"\nPublished {len(batch)} key(s) to the key database."
+        except UpstreamUnavailable as e:
+            status_text += f"\nFailed to publish keys: {e}"
+
+    await interaction.followup.send(
+        status_text,
+        view=KeyDownloadView(batch),
         ephemeral=True
     )
 
@@ -1332,8 +3392,6 @@ async def generate_key_command(interaction: discord.Interaction, amount: int, da
 # Ticket 
 # ============================
 class TicketTypeDropdown(ui.Select):
-    cooldowns = {}
-
     def __init__(self):
         options = [
             discord.SelectOption(label="Purchase", description="Help with buying or payment"),
@@ -1348,7 +3406,7 @@ class TicketTypeDropdown(ui.Select):
         guild = interaction.guild
         category = guild.get_channel(TICKET_CATEGORY_ID)
 
-        allowed, remaining = check_ticket_cooldown(user.id, self.cooldowns)
+        allowed, remaining = check_ticket_cooldown(user.id)
         if not allowed:
             return await interaction.response.send_message(
                 f"You can create another ticket in {remaining} minute(s).",
@@ -1438,7 +3496,7 @@ async def set_ticket(interaction: Interaction):
 @app_commands.autocomplete(script=script_autocomplete)
 async def get_script(interaction: discord.Interaction, script: str):
 
-    user_key = fetch_user_key(interaction)
+    user_key = await fetch_user_key(interaction)
     if not user_key:
         await interaction.response.send_message(
             "You are not whitelisted.",
@@ -1446,7 +3504,7 @@ async def get_script(interaction: discord.Interaction, script: str):
         )
         return
 
-    scripts_data = fetch_scripts_data()
+    scripts_data = await fetch_scripts_data()
     script_info = scripts_data.get(script)
 
     if not script_info:
@@ -1479,6 +3537,7 @@ async def resethwid_cooldown(interaction: discord.Interaction, duration: str):
         return
 
     hwid_reset_cooldown = parsed
+    reschedule_hwid_cooldowns()
 
     await interaction.response.send_message(
         f"Cooldown updated to {hwid_reset_cooldown}.",
@@ -1498,7 +3557,7 @@ async def resethwid_cooldown(interaction: discord.Interaction, duration: str):
 async def whitelist(interaction: discord.Interaction, member: discord.Member, days: int, note: str = ""):
     await interaction.response.defer(ephemeral=True)
 
-    user = fetch_user_data_from_id(member.id)
+    user = await fetch_user_data_from_id(member.id, PRIORITY_STAFF)
 
     if user:
         user_key = user["user_key"]
@@ -1507,7 +3566,8 @@ async def whitelist(interaction: discord.Interaction, member: discord.Member, da
         new_days = current_days + days
 
         if new_days <= 0:
-            result = delete_user_key(user_key)
+            result = await delete_user_key(user_key)
+            invalidate_user(member.id)
 
             if not result.get("success"):
                 return await interaction.followup.send(
@@ -1531,14 +3591,18 @@ async def whitelist(interaction: discord.Interaction, member: discord.Member, da
                 ephemeral=True
             )
 
-        delete_result = delete_user_key(user_key)
+        delete_result = await delete_user_key(user_key)
         if not delete_result.get("success"):
+            invalidate_user(member.id)
             return await interaction.followup.send(
                 f"Failed to update whitelist for {member.display_name}.",
                 ephemeral=True
             )
+        # The key is recreated right away, so reconcile only after the last mutation
+        invalidate_user(member.id, reconcile=False)
 
-        create_result = create_user_key(member.id, new_days, note)
+        create_result = await create_user_key(member.id, new_days, note)
+        invalidate_user(member.id)
         if not create_result.get("success"):
             return await interaction.followup.send(
                 f"Failed to re-whitelist {member.display_name}: {create_result.get('message')}",
@@ -1560,7 +3624,8 @@ async def whitelist(interaction: discord.Interaction, member: discord.Member, da
 
         return await interaction.followup.send("Whitelist updated.", ephemeral=True)
 
-    create_result = create_user_key(member.id, days, note)
+    create_result = await create_user_key(member.id, days, note)
+    invalidate_user(member.id)
     if not create_result.get("success"):
         return await interaction.followup.send(
             f"Failed to whitelist {member.display_name}.",
@@ -1588,13 +3653,14 @@ async def whitelist(interaction: discord.Interaction, member: discord.Member, da
 async def unwhitelist(interaction: discord.Interaction, member: discord.Member):
     await interaction.response.defer(ephemeral=True)
 
-    user = fetch_user_data_from_id(member.id)
+    user = await fetch_user_data_from_id(member.id, PRIORITY_STAFF)
     if not user:
         return await interaction.followup.send("User has no whitelist.", ephemeral=True)
 
     user_key = user["user_key"]
 
-    delete_result = delete_user_key(user_key)
+    delete_result = await delete_user_key(user_key)
+    invalidate_user(member.id)
     if not delete_result.get("success"):
         return await interaction.followup.send(
             f"Failed to unwhitelist {member.display_name}: {delete_result.get('message')}",
@@ -1620,7 +3686,7 @@ async def unwhitelist(interaction: discord.Interaction, member: discord.Member):
 async def resethwid(interaction: discord.Interaction, member: discord.Member):
     await interaction.response.defer(ephemeral=True)
 
-    user = fetch_user_data_from_id(member.id)
+    user = await fetch_user_data_from_id(member.id, PRIORITY_STAFF)
     if not user:
         return await interaction.followup.send(
             f"No whitelist found for {member.display_name}.",
@@ -1634,7 +3700,8 @@ async def resethwid(interaction: discord.Interaction, member: discord.Member):
             ephemeral=True
         )
 
-    result = reset_hwid_api(user_key)
+    result = await reset_hwid_api(user_key, PRIORITY_STAFF)
+    invalidate_user(member.id)
 
     if result.get("success"):
         status_text = "HWID reset successfully!"
@@ -1674,7 +3741,7 @@ async def blacklist(
 ):
     await interaction.response.defer(ephemeral=True)
 
-    user = fetch_user_data_from_id(member.id)
+    user = await fetch_user_data_from_id(member.id, PRIORITY_STAFF)
     if not user:
         return await interaction.followup.send("User not found in whitelist.", ephemeral=True)
 
@@ -1689,7 +3756,8 @@ async def blacklist(
             ephemeral=True
         )
 
-    result = blacklist_user(user_key, reason, ban_expire)
+    result = await blacklist_user(user_key, reason, ban_expire)
+    invalidate_user(member.id)
 
     if not result.get("success"):
         status_text = f"Failed to blacklist: {result.get('message')}"
@@ -1697,6 +3765,7 @@ async def blacklist(
     else:
         status_text = f"User blacklisted ({expire_text})"
         color = discord.Color.red()
+        track_blacklist_expiry(interaction.guild, member, user_key, ban_expire)
 
     await interaction.followup.send(
         f"{member.display_name} {status_text}.",
@@ -1716,7 +3785,7 @@ async def blacklist(
 async def unblacklist(interaction: discord.Interaction, member: discord.Member):
     await interaction.response.defer(ephemeral=True)
 
-    user = fetch_user_data_from_id(member.id)
+    user = await fetch_user_data_from_id(member.id, PRIORITY_STAFF)
     if not user:
         return await interaction.followup.send("User not found in whitelist.", ephemeral=True)
 
@@ -1729,9 +3798,11 @@ async def unblacklist(interaction: discord.Interaction, member: discord.Member):
             ephemeral=True
         )
 
-    response = unblacklist_user(unban_token)
+    response = await unblacklist_user(unban_token)
+    invalidate_user(member.id)
 
-    if response.status_code == 200:
+    if response.status == 200:
+        job_scheduler.cancel("blacklist_expiry", member.id)
         status_text = "User successfully unblacklisted!"
         color = discord.Color.green()
     else:
@@ -1883,6 +3954,159 @@ async def send(interaction: discord.Interaction, text: str, channel: str = None)
 async def website(interaction: discord.Interaction, page: app_commands.Choice[str]):
     await interaction.response.send_message(website_link + page.value)
 
+# ============================
+# Bot Stats
+# ============================
+def build_stats_embed():
+    embed = discord.Embed(title="Xecret Hub | Bot Stats", color=discord.Color.blurple())
+
+    cache = user_cache.stats()
+    embed.add_field(
+        name="User Cache",
+        value=(
+            f"Size: {cache['size']}/{user_cache.max_size}\n"
+            f"Hits: {cache['hits']}\n"
+            f"Misses: {cache['misses']}\n"
+            f"Hit Rate: {cache['hit_rate']:.1%}"
+        ),
+        inline=True,
+    )
+    scheduler = luarmor_scheduler.stats()
+    lane_names = {PRIORITY_STAFF: "Staff", PRIORITY_BUYER: "Buyer", PRIORITY_BACKGROUND: "Background"}
+    lane_lines = [
+        f"{lane_names[p]}: {lane['depth']} queued, "
+        f"avg {lane['avg_wait']:.2f}s / max {lane['max_wait']:.2f}s"
+        for p, lane in sorted(scheduler["lanes"].items())
+    ]
+    embed.add_field(
+        name="Luarmor Queue",
+        value=(
+            "\n".join(lane_lines) + "\n"
+            f"Tokens: {scheduler['tokens']:.1f}/{luarmor_scheduler.burst}\n"
+            f"Rate Limited: {scheduler['rate_limited']}\n"
+            f"Paused For: {scheduler['paused_for']:.1f}s"
+        ),
+        inline=False,
+    )
+    mirror = user_mirror.stats()
+    mirror_lines = [
+        f"Ready: {'Yes' if mirror['ready'] else 'No'}",
+        f"Users: {mirror['total']}",
+    ]
+    for status, count in sorted(mirror["by_status"].items(), key=lambda item: str(item[0])):
+        mirror_lines.append(f"{(status or 'unknown').capitalize()}: {count}")
+    mirror_lines.append(f"Expiring in 24h: {mirror['expiring']}")
+    mirror_lines.append(f"Last Synced: {ts_to_datetime(user_mirror.last_synced)}")
+    embed.add_field(name="User Mirror", value="\n".join(mirror_lines), inline=True)
+    embed.add_field(
+        name="JSONBin Sync",
+        value="\n".join(
+            f"{record.name.capitalize()}: {len(record.record)} entries, "
+            f"synced {ts_to_datetime(record.last_synced)}, "
+            f"changed {ts_to_datetime(record.last_changed)}"
+            f"{' (failing)' if record.failing else ''}"
+            for record in jsonbin_records
+        ),
+        inline=False,
+    )
+    redemptions = redemption_ledger.stats()
+    embed.add_field(
+        name="Redemptions",
+        value=(
+            f"Redeemed: {redemptions.get('redeemed', 0)}\n"
+            f"Pending: {redemptions.get('pending', 0)}\n"
+            f"Unknown: {redemptions.get('unknown', 0)}"
+        ),
+        inline=True,
+    )
+    embed.add_field(
+        name="Circuit Breakers",
+        value="\n".join(
+            f"{breaker.name}: {breaker.state.replace('_', '-')} (trips: {breaker.trips})"
+            for breaker in circuit_breakers
+        ),
+        inline=False,
+    )
+    embed.add_field(
+        name="Request Coalescing",
+        value=(
+            f"In Flight: {len(single_flight.in_flight)}\n"
+            f"Coalesced: {single_flight.coalesced}"
+        ),
+        inline=True,
+    )
+    embed.add_field(
+        name="Event Edits",
+        value=(
+            f"Sent: {event_editor.edits}\n"
+            f"Coalesced: {event_editor.coalesced}\n"
+            f"Queued: {len(event_editor.pending)}"
+        ),
+        inline=True,
+    )
+    jobs = job_scheduler.stats()
+    job_lines = [
+        f"{kind}: {count} pending, next {ts_to_datetime(next_due)}"
+        for kind, (count, next_due) in sorted(jobs["kinds"].items())
+    ]
+    job_lines.append(f"Completed: {jobs['completed']} | Failed: {jobs['failed']}")
+    embed.add_field(name="Scheduled Jobs", value="\n".join(job_lines), inline=False)
+    feeds = feed_scheduler.stats()
+    intervals = sorted(feed["interval"] for feed in feeds)
+    embed.add_field(
+        name="YouTube Feeds",
+        value=(
+            f"Feeds: {len(feeds)}\n"
+            f"Polling: {len(feed_scheduler.running)}\n"
+            f"Backing Off: {sum(1 for feed in feeds if feed['errors'])}\n"
+            f"Median Interval: {intervals[len(intervals) // 2] / 60:.0f}m"
+            if intervals else "No feeds"
+        ),
+        inline=True,
+    )
+
+    return embed
+
+
+def build_feed_stats_embed():
+    names = {url: name for name, url in feed_url_youtube.items()}
+    lines = []
+    for feed in sorted(feed_scheduler.stats(), key=lambda feed: feed["next_in"]):
+        status = f" | failing x{feed['errors']}" if feed["errors"] else ""
+        if feed["awaiting"]:
+            status += f" | awaiting {feed['awaiting']} pushed"
+        lines.append(
+            f"**{names.get(feed['url'], feed['url'])}**: every {feed['interval'] / 60:.0f}m, "
+            f"next in {feed['next_in'] / 60:.0f}m{status}\n"
+            f"Last success: {ts_to_datetime(feed['last_success'])} | "
+            f"Last new video: {ts_to_datetime(feed['last_new_video'])}"
+        )
+
+    description = ""
+    for index, line in enumerate(lines):
+        if len(description) + len(line) > 3900:
+            description += f"...and {len(lines) - index} more"
+            break
+        description += line + "\n"
+
+    return discord.Embed(
+        title="Xecret Hub | Feed Stats",
+        description=description or "No feeds configured",
+        color=discord.Color.from_rgb(200, 0, 0),
+    )
+
+
+@bot.tree.command(name="bot-stats", description="Show cache and API statistics")
+@is_support_or_admin()
+async def bot_stats(interaction: discord.Interaction):
+    await interaction.response.send_message(embed=build_stats_embed(), ephemeral=True)
+
+
+@bot.tree.command(name="feed-stats", description="Show YouTube feed polling statistics")
+@is_support_or_admin()
+async def feed_stats(interaction: discord.Interaction):
+    await interaction.response.send_message(embed=build_feed_stats_embed(), ephemeral=True)
+
 # message
 @bot.event
 async def on_message(message):
@@ -1912,5 +4136,7 @@ async def on_message(message):
         await message.delete()
     await bot.process_commands(message)
 
+if websub_enabled:
+    configure_websub(on_websub_push, websub_secret, feed_url_youtube.values())
 server_on()
 bot.run(bot_token)
@@ -1,11 +1,52 @@
-from flask import Flask
+import hmac
+import hashlib
+import time
+from flask import Flask, request
 from threading import Thread
 app = Flask('')
+websub = {"handler": None, "secret": "", "topics": set(), "leases": {}, "pending": {}}
 @app.route('/')
 def home():
     return "I'm alive!"
+def configure_websub(handler, secret, topics):
+    websub["handler"] = handler
+    websub["secret"] = secret or ""
+    websub["topics"] = set(topics)
+def expect_websub_verification(topic, lease_seconds):
+    # Called before each subscribe request; only these topics may be verified
+    websub["pending"][topic] = lease_seconds
+def websub_lease_expiry(topic):
+    return websub["leases"].get(topic)
+def valid_signature(body, signature):
+    algorithm, _, digest = signature.partition("=")
+    if algorithm not in ("sha1", "sha256", "sha384", "sha512"):
+        return False
+    expected = hmac.new(websub["secret"].encode(), body, getattr(hashlib, algorithm)).hexdigest()
+    return hmac.compare_digest(expected, digest)
+@app.route('/websub/youtube', methods=['GET'])
+def websub_verify():
+    # Verification is unauthenticated, so only confirm a subscribe request we are waiting on
+    mode = request.args.get("hub.mode")
+    topic = request.args.get("hub.topic")
+    challenge = request.args.get("hub.challenge")
+    if mode != "subscribe" or topic not in websub["topics"] or topic not in websub["pending"] or not challenge:
+        return "", 404
+    requested = websub["pending"].pop(topic)
+    lease = request.args.get("hub.lease_seconds", type=int)
+    # Never trust a lease longer than we asked for, or renewal would be skipped
+    websub["leases"][topic] = time.time() + min(lease, requested) if lease else None
+    return challenge, 200
+@app.route('/websub/youtube', methods=['POST'])
+def websub_notify():
+    body = request.get_data()
+    # Unsigned pushes are never trusted; per the spec, bad signatures still get a 2xx
+    if not websub["secret"] or not valid_signature(body, request.headers.get("X-Hub-Signature", "")):
+        return "", 202
+    if websub["handler"]:
+        websub["handler"](body)
+    return "", 204
 def run():
     app.run(host='0.0.0.0',port=8080)
 def server_on():
     t = Thread(target=run)
-    t.start()
\ No newline at end of file
+    t.start()